@@ -0,0 +1,470 @@
+"""
+Latency and throughput of every endpoint of the API routers, for pythonic storage and SQLite seeded with the same
+synthetic tables. Requests are sent one by one through an in-process ASGI client: reads go first, then creates,
+patches and deletes, which only touch entities created by the benchmark, so every endpoint sees the same data.
+Other database settings are taken from DB_* environment variables, e.g. DB_SQLITE_POOL=true.
+
+    python benchmarks/api.py --rows 10000 --requests 200
+    python benchmarks/api.py --save-baseline benchmarks/baseline.json
+    python benchmarks/api.py --baseline benchmarks/baseline.json --threshold 0.2
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, NamedTuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from asgi import lifespan, request  # noqa: E402
+from dataset import write_sqlite  # noqa: E402
+from startup import make_tables  # noqa: E402
+
+from config.settings import AppSettings, DatabaseSettings, DBTypeEnum, Settings  # noqa: E402
+from controller.routers import api_routers  # noqa: E402
+from main import build_app  # noqa: E402
+
+ADMIN_ID = 1
+PAGE_SIZE = 100
+BULK_SIZE = 10
+
+
+class Request(NamedTuple):
+    url: str
+    body: Any = None
+    user: int = ADMIN_ID
+    content_type: str = "application/json"
+
+
+class Case(NamedTuple):
+    """The i-th request of an endpoint is made by `make_request(i)`"""
+
+    name: str
+    method: str
+    # path of the route, to tell which routes are not benchmarked
+    path: str
+    make_request: Callable[[int], Request]
+    # ids of entities created by the requests are stored in `created` under this key
+    creates: str | None = None
+
+
+class Stats(NamedTuple):
+    p50_ms: float
+    p99_ms: float
+    rps: float
+
+
+def _pick(i: int, count: int) -> int:
+    """Id of the i-th request among `count` rows, spread over the table instead of going in order"""
+    return i * 7919 % count + 1
+
+
+def _place(i: int) -> str:
+    return f"{'ABCDEF'[i % 6]}{i % 90 + 10}"
+
+
+def _trip(i: int, company: int) -> dict:
+    time_out = datetime(2024, 1, 1) + timedelta(minutes=i)
+    return {
+        "company": company,
+        "plane": "Boeing-737",
+        "town_from": f"Town {i % 100}",
+        "town_to": f"Town {i % 100 + 100}",
+        "time_out": time_out.isoformat(),
+        "time_in": (time_out + timedelta(hours=2)).isoformat(),
+    }
+
+
+def _ndjson(url: str, items: list[dict]) -> Request:
+    return Request(url, "\n".join(json.dumps(item) for item in items).encode(), content_type="application/x-ndjson")
+
+
+def make_cases(tables: dict[str, list[dict]], created: dict[str, list[int]]) -> list[Case]:
+    """Requests of every route of the API routers, writes take ids of entities from `created`"""
+    companies, trips, users = len(tables["companies"]), len(tables["trips"]), len(tables["users"])
+    tickets = tables["pass_in_trip"]
+
+    def ticket(i: int) -> dict:
+        return tickets[_pick(i, len(tickets)) - 1]
+
+    def window(i: int) -> str:
+        day = datetime(2023, 1, 1) + timedelta(days=i % 365)
+        return f"time_out_ge={day.isoformat()}&time_out_le={(day + timedelta(days=1)).isoformat()}"
+
+    def bulk(key: str, i: int) -> list[int]:
+        return created[key][i * BULK_SIZE : (i + 1) * BULK_SIZE]
+
+    reads = [
+        Case("ping", "GET", "/healthcheck/ping", lambda i: Request("/healthcheck/ping")),
+        Case("metrics", "GET", "/healthcheck/metrics", lambda i: Request("/healthcheck/metrics")),
+        Case("users", "GET", "/admin/users", lambda i: Request(f"/admin/users?page_size={PAGE_SIZE}")),
+        Case("users?role", "GET", "/admin/users", lambda i: Request(f"/admin/users?role=ADMIN&page_size={PAGE_SIZE}")),
+        Case("users/count", "GET", "/admin/users/count", lambda i: Request("/admin/users/count")),
+        Case("users/count?role", "GET", "/admin/users/count", lambda i: Request("/admin/users/count?role=PASSENGER")),
+        Case("users/{id}", "GET", "/admin/users/{_id}", lambda i: Request(f"/admin/users/{_pick(i, users)}")),
+        Case("profile/me", "GET", "/profile/me", lambda i: Request("/profile/me", user=_pick(i, users))),
+        Case("companies", "GET", "/companies", lambda i: Request(f"/companies?page_size={PAGE_SIZE}")),
+        Case(
+            "companies?ids",
+            "GET",
+            "/companies",
+            lambda i: Request(f"/companies?ids={_pick(i, companies)}&ids={_pick(i + 1, companies)}"),
+        ),
+        Case("companies?name", "GET", "/companies", lambda i: Request(f"/companies?name=Company {i % 100}")),
+        Case("companies/count", "GET", "/companies/count", lambda i: Request("/companies/count")),
+        Case("companies/{id}", "GET", "/companies/{_id}", lambda i: Request(f"/companies/{_pick(i, companies)}")),
+        Case("trips", "GET", "/trips", lambda i: Request(f"/trips?page_size={PAGE_SIZE}")),
+        Case("trips?company", "GET", "/trips", lambda i: Request(f"/trips?company={_pick(i, companies)}")),
+        Case("trips?time_out", "GET", "/trips", lambda i: Request(f"/trips?{window(i)}&page_size={PAGE_SIZE}")),
+        Case("trips?town_from", "GET", "/trips", lambda i: Request(f"/trips?town_from=Town {i % 100}")),
+        Case("trips/count", "GET", "/trips/count", lambda i: Request("/trips/count")),
+        Case(
+            "trips/count?company",
+            "GET",
+            "/trips/count",
+            lambda i: Request(f"/trips/count?company={_pick(i, companies)}"),
+        ),
+        Case("trips/cursor", "GET", "/trips/cursor", lambda i: Request(f"/trips/cursor?limit={PAGE_SIZE}")),
+        Case("trips/{id}", "GET", "/trips/{_id}", lambda i: Request(f"/trips/{_pick(i, trips)}")),
+        Case(
+            "trips/export?company",
+            "GET",
+            "/trips/export",
+            lambda i: Request(f"/trips/export?company={_pick(i, companies)}"),
+        ),
+        Case("tickets", "GET", "/admin/tickets", lambda i: Request(f"/admin/tickets?page_size={PAGE_SIZE}")),
+        Case("tickets?trip", "GET", "/admin/tickets", lambda i: Request(f"/admin/tickets?trip={ticket(i)['trip']}")),
+        Case("tickets/count", "GET", "/admin/tickets/count", lambda i: Request("/admin/tickets/count")),
+        Case(
+            "tickets/cursor",
+            "GET",
+            "/admin/tickets/cursor",
+            lambda i: Request(f"/admin/tickets/cursor?limit={PAGE_SIZE}"),
+        ),
+        Case(
+            "tickets/{id}", "GET", "/admin/tickets/{_id}", lambda i: Request(f"/admin/tickets/{_pick(i, len(tickets))}")
+        ),
+        Case(
+            "tickets/export?trip",
+            "GET",
+            "/admin/tickets/export",
+            lambda i: Request(f"/admin/tickets/export?trip={ticket(i)['trip']}"),
+        ),
+        Case(
+            "profile/tickets",
+            "GET",
+            "/profile/tickets",
+            lambda i: Request("/profile/tickets", user=ticket(i)["passenger"]),
+        ),
+        Case(
+            "profile/tickets?place",
+            "GET",
+            "/profile/tickets",
+            lambda i: Request(f"/profile/tickets?place={ticket(i)['place']}", user=ticket(i)["passenger"]),
+        ),
+        Case(
+            "profile/tickets/count",
+            "GET",
+            "/profile/tickets/count",
+            lambda i: Request("/profile/tickets/count", user=ticket(i)["passenger"]),
+        ),
+        Case(
+            "profile/tickets/{id}",
+            "GET",
+            "/profile/tickets/{_id}",
+            lambda i: Request(f"/profile/tickets/{_pick(i, len(tickets))}", user=ticket(i)["passenger"]),
+        ),
+    ]
+    creates = [
+        Case("companies", "POST", "/companies", lambda i: Request("/companies", {"name": f"Company {i}"}), "companies"),
+        Case("trips", "POST", "/trips", lambda i: Request("/trips", _trip(i, created["companies"][i])), "trips"),
+        Case(
+            "users",
+            "POST",
+            "/admin/users",
+            lambda i: Request("/admin/users", {"name": f"User {i}", "role": "PASSENGER"}),
+            "users",
+        ),
+        Case(
+            "register",
+            "POST",
+            "/profile/register",
+            lambda i: Request("/profile/register", {"name": f"User {i}"}),
+            "profiles",
+        ),
+        Case(
+            "tickets",
+            "POST",
+            "/admin/tickets",
+            lambda i: Request(
+                "/admin/tickets", {"place": _place(i), "trip": created["trips"][i], "passenger": created["users"][i]}
+            ),
+            "tickets",
+        ),
+        Case(
+            "profile/tickets",
+            "POST",
+            "/profile/tickets",
+            lambda i: Request(
+                "/profile/tickets", {"place": _place(i), "trip": created["trips"][i]}, user=created["profiles"][i]
+            ),
+        ),
+        Case(
+            "companies/bulk",
+            "POST",
+            "/companies/bulk",
+            lambda i: Request("/companies/bulk", [{"name": f"Company {i}.{j}"} for j in range(BULK_SIZE)]),
+            "companies_bulk",
+        ),
+        Case(
+            "trips/bulk",
+            "POST",
+            "/trips/bulk",
+            lambda i: Request("/trips/bulk", [_trip(i, _pick(i + j, companies)) for j in range(BULK_SIZE)]),
+            "trips_bulk",
+        ),
+        Case(
+            "tickets/bulk",
+            "POST",
+            "/admin/tickets/bulk",
+            lambda i: Request(
+                "/admin/tickets/bulk",
+                [
+                    {"place": _place(i + j), "trip": _pick(i + j, trips), "passenger": _pick(i + j, users)}
+                    for j in range(BULK_SIZE)
+                ],
+            ),
+            "tickets_bulk",
+        ),
+        Case(
+            "trips/import",
+            "POST",
+            "/trips/import",
+            lambda i: _ndjson("/trips/import", [_trip(i, _pick(i + j, companies)) for j in range(BULK_SIZE)]),
+        ),
+        Case(
+            "tickets/import",
+            "POST",
+            "/admin/tickets/import",
+            lambda i: _ndjson(
+                "/admin/tickets/import",
+                [
+                    {"place": _place(i + j), "trip": _pick(i + j, trips), "passenger": _pick(i + j, users)}
+                    for j in range(BULK_SIZE)
+                ],
+            ),
+        ),
+    ]
+    patches = [
+        Case(
+            "companies/{id}",
+            "PATCH",
+            "/companies/{_id}",
+            lambda i: Request(f"/companies/{created['companies'][i]}", {"name": f"Company {i}!"}),
+        ),
+        Case(
+            "trips/{id}",
+            "PATCH",
+            "/trips/{_id}",
+            lambda i: Request(f"/trips/{created['trips'][i]}", {"town_to": f"Town {i % 100 + 200}"}),
+        ),
+        Case(
+            "users/{id}",
+            "PATCH",
+            "/admin/users/{_id}",
+            lambda i: Request(f"/admin/users/{created['users'][i]}", {"name": f"User {i}!"}),
+        ),
+        Case(
+            "profile/me",
+            "PATCH",
+            "/profile/me",
+            lambda i: Request("/profile/me", {"name": f"User {i}!"}, user=created["profiles"][i]),
+        ),
+        Case(
+            "tickets/{id}",
+            "PATCH",
+            "/admin/tickets/{_id}",
+            lambda i: Request(f"/admin/tickets/{created['tickets'][i]}", {"place": _place(i + 1)}),
+        ),
+        Case(
+            "companies/bulk",
+            "PATCH",
+            "/companies/bulk",
+            lambda i: Request(
+                "/companies/bulk", [{"id": _id, "name": f"Company {_id}!"} for _id in bulk("companies_bulk", i)]
+            ),
+        ),
+        Case(
+            "trips/bulk",
+            "PATCH",
+            "/trips/bulk",
+            lambda i: Request("/trips/bulk", [{"id": _id, "plane": "Airbus A320"} for _id in bulk("trips_bulk", i)]),
+        ),
+        Case(
+            "tickets/bulk",
+            "PATCH",
+            "/admin/tickets/bulk",
+            lambda i: Request(
+                "/admin/tickets/bulk", [{"id": _id, "place": _place(i)} for _id in bulk("tickets_bulk", i)]
+            ),
+        ),
+    ]
+    # tickets before trips and users, trips before companies, so deletes don't cascade into the rows of later deletes
+    deletes = [
+        Case(
+            "tickets/{id}",
+            "DELETE",
+            "/admin/tickets/{_id}",
+            lambda i: Request(f"/admin/tickets/{created['tickets'][i]}"),
+        ),
+        Case(
+            "tickets/bulk",
+            "DELETE",
+            "/admin/tickets/bulk",
+            lambda i: Request("/admin/tickets/bulk", bulk("tickets_bulk", i)),
+        ),
+        Case("trips/{id}", "DELETE", "/trips/{_id}", lambda i: Request(f"/trips/{created['trips'][i]}")),
+        Case("trips/bulk", "DELETE", "/trips/bulk", lambda i: Request("/trips/bulk", bulk("trips_bulk", i))),
+        Case(
+            "companies/{id}", "DELETE", "/companies/{_id}", lambda i: Request(f"/companies/{created['companies'][i]}")
+        ),
+        Case(
+            "companies/bulk",
+            "DELETE",
+            "/companies/bulk",
+            lambda i: Request("/companies/bulk", bulk("companies_bulk", i)),
+        ),
+        Case("users/{id}", "DELETE", "/admin/users/{_id}", lambda i: Request(f"/admin/users/{created['users'][i]}")),
+        Case("profile/me", "DELETE", "/profile/me", lambda i: Request("/profile/me", user=created["profiles"][i])),
+    ]
+    return reads + creates + patches + deletes
+
+
+def check_coverage(cases: list[Case]):
+    """Warns about routes of the API routers without cases, so new endpoints are not left out silently"""
+    covered = {(case.method, case.path) for case in cases}
+    for router in api_routers:
+        for route in router.routes:
+            for method in sorted(route.methods):
+                if (method, route.path) not in covered:
+                    print(f"not benchmarked: {method} {route.path}", file=sys.stderr)
+
+
+def percentile(latencies: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted `latencies`"""
+    return latencies[max(math.ceil(fraction * len(latencies)) - 1, 0)]
+
+
+async def measure(app, case: Case, count: int, created: dict[str, list[int]]) -> Stats:
+    latencies = []
+    for i in range(count):
+        url, body, user, content_type = case.make_request(i)
+        headers = {"Authorization": f"Bearer {user}", "Content-Type": content_type}
+        if body is not None and not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        started_at = perf_counter()
+        status, response_headers, response_body = await request(app, case.method, url, headers, body or b"")
+        latencies.append(perf_counter() - started_at)
+        assert status < 300, (case.method, url, status, response_body[:300])
+        if case.creates:
+            created.setdefault(case.creates, []).extend(_created_ids(response_headers, response_body))
+    latencies.sort()
+    # requests are sent one at a time, so throughput is the inverse of the mean latency
+    return Stats(percentile(latencies, 0.5) * 1000, percentile(latencies, 0.99) * 1000, count / sum(latencies))
+
+
+def _created_ids(headers: dict[str, str], body: bytes) -> list[int]:
+    if user_id := headers.get("userid"):
+        return [int(user_id)]
+    data = json.loads(body)
+    if isinstance(data, dict) and "items" in data:
+        return [item["id"] for item in data["items"]]
+    return [data["id"]]
+
+
+async def run(database: DatabaseSettings, tables: dict[str, list[dict]], count: int, warmup: int) -> dict[str, Stats]:
+    created: dict[str, list[int]] = {}
+    cases = make_cases(tables, created)
+    check_coverage(cases)
+    result = {}
+    async with lifespan(build_app(Settings(AppSettings(), database))) as app:
+        for case in cases:
+            if case.method == "GET":
+                await measure(app, case, warmup, created)
+            result[f"{case.method} {case.name}"] = await measure(app, case, count, created)
+    return result
+
+
+def compare(results: dict[str, dict[str, Stats]], baseline: dict, threshold: float) -> list[str]:
+    """Endpoints, which p50 latency grew by more than `threshold` from the baseline"""
+    regressions = []
+    for backend, stats_by_endpoint in results.items():
+        for endpoint, stats in stats_by_endpoint.items():
+            if (previous := baseline.get(backend, {}).get(endpoint)) is None:
+                continue
+            if stats.p50_ms > previous["p50_ms"] * (1 + threshold):
+                regressions.append(f"{backend} {endpoint}: p50 {previous['p50_ms']:.3f} -> {stats.p50_ms:.3f} ms")
+    return regressions
+
+
+def print_results(backend: str, stats_by_endpoint: dict[str, Stats], baseline: dict):
+    print(f"\n{backend}\n{'endpoint':<32} {'p50, ms':>9} {'p99, ms':>9} {'rps':>8} {'p50 vs baseline':>16}")
+    for endpoint, stats in stats_by_endpoint.items():
+        previous = baseline.get(backend, {}).get(endpoint)
+        change = f"{stats.p50_ms / previous['p50_ms'] - 1:+.0%}" if previous else "-"
+        print(f"{endpoint:<32} {stats.p50_ms:>9.3f} {stats.p99_ms:>9.3f} {stats.rps:>8.0f} {change:>16}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="trips and tickets, a tenth of it for other tables")
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10, help="requests per read endpoint before measuring")
+    parser.add_argument("--backends", nargs="+", choices=[item.value for item in DBTypeEnum], default=list(DBTypeEnum))
+    parser.add_argument("--baseline", type=Path, help="results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed growth of p50 latency from the baseline")
+    parser.add_argument("--save-baseline", type=Path, help="file to store results in")
+    args = parser.parse_args()
+
+    tables = make_tables(args.rows)
+    tables["users"][ADMIN_ID - 1]["role"] = "ADMIN"
+    parameters = {"rows": args.rows, "requests": args.requests, "warmup": args.warmup}
+    baseline = {}
+    if args.baseline:
+        stored = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if stored["parameters"] != parameters:
+            print(f"baseline is measured with other parameters: {stored['parameters']}", file=sys.stderr)
+        baseline = stored["results"]
+    results = {}
+    for backend in map(DBTypeEnum, args.backends):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path, address = Path(directory, "storage.json"), Path(directory, "storage.db")
+            if backend == DBTypeEnum.sqlite:
+                write_sqlite(address, tables)
+            else:
+                file_path.write_text(json.dumps(tables), encoding="utf-8")
+            database = DatabaseSettings(database_type=backend, file_path=file_path, address=str(address))
+            results[backend.value] = asyncio.run(run(database, tables, args.requests, args.warmup))
+        print_results(backend.value, results[backend.value], baseline)
+
+    if args.save_baseline:
+        stored = {
+            backend: {
+                endpoint: {key: round(value, 3) for key, value in stats._asdict().items()}
+                for endpoint, stats in stats_by_endpoint.items()
+            }
+            for backend, stats_by_endpoint in results.items()
+        }
+        args.save_baseline.write_text(json.dumps({"parameters": parameters, "results": stored}, indent=2) + "\n")
+    if regressions := compare(results, baseline, args.threshold):
+        print("\nRegressions:", *regressions, sep="\n")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
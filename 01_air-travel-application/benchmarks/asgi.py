@@ -0,0 +1,52 @@
+"""Minimal in-process ASGI client, so benchmarks measure the application without a network stack"""
+import asyncio
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+
+async def request(
+    app, method: str, url: str, headers: dict[str, str] | None = None, body: bytes = b""
+) -> tuple[int, dict[str, str], bytes]:
+    split_url = urlsplit(url)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": split_url.path,
+        "raw_path": split_url.path.encode(),
+        "query_string": split_url.query.encode(),
+        "root_path": "",
+        "headers": [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status, response_headers, chunks = 0, {}, []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+
+    async def send(message: dict):
+        nonlocal status, response_headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = {key.decode(): value.decode() for key, value in message.get("headers", ())}
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, response_headers, b"".join(chunks)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Runs startup handlers of the application on enter and shutdown handlers on exit"""
+    await app.router.startup()
+    try:
+        yield app
+    finally:
+        await app.router.shutdown()
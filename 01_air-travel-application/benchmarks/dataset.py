@@ -0,0 +1,210 @@
+"""
+Deterministic synthetic airline dataset for load and scale testing, written straight into the native format
+of each backend: a storage file of pythonic storage and an SQLite database of init.sql. Rows are generated lazily
+table by table and streamed into the output, so millions of rows are never held in memory at once.
+
+    python benchmarks/dataset.py --trips 1000000 --sqlite storage.db --storage storage.json --trusted
+"""
+import argparse
+import json
+import random
+import sqlite3
+import sys
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+from typing import Iterable, Iterator, Mapping, NamedTuple
+
+SRC_PATH = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC_PATH))
+
+from model.db_entities.models import CompanyModel, PassInTripModel, TripModel, UserModel  # noqa: E402
+from model.enum import PlaneEnum, UserRoleEnum  # noqa: E402
+from model.storage.pythonic.snapshot import write_trusted_snapshot_rows  # noqa: E402
+from model.storage.raw_sql.schema import migrate  # noqa: E402
+
+INIT_SQL_PATH = SRC_PATH / "model/storage/raw_sql/init.sql"
+# in order of foreign keys
+MODELS = (CompanyModel, UserModel, TripModel, PassInTripModel)
+
+# narrow-body jets fly most of the trips
+PLANE_WEIGHTS = {
+    PlaneEnum.Airbus_A320: 30,
+    PlaneEnum.Boeing_737: 30,
+    PlaneEnum.Airbus_A220: 6,
+    PlaneEnum.Embraer_ERJ: 5,
+}
+TOWNS = (
+    "London, Dubai, Istanbul, Paris, Frankfurt, Amsterdam, Madrid, Moscow, New York, Atlanta, Chicago, Los Angeles, "
+    "Singapore, Tokyo, Seoul, Beijing, Delhi, Doha, Rome, Munich, Barcelona, Vienna, Zurich, Lisbon, Prague, Warsaw, "
+    "Helsinki, Oslo, Stockholm, Copenhagen, Athens, Cairo, Toronto, Sydney, Bangkok, Saratov, Kazan, Yerevan"
+).split(", ")
+# seats of one trip: the place pattern is ^[A-F]\d\d$
+SEATS = tuple(f"{letter}{row:02d}" for row in range(1, 100) for letter in "ABCDEF")
+START = datetime(2023, 1, 1)
+
+
+class DatasetSettings(NamedTuple):
+    trips: int
+    companies: int
+    users: int
+    # tickets of a trip are uniformly distributed between 0 and twice of it
+    tickets_per_trip: float = 3.0
+    admin_share: float = 0.001
+    seed: int = 0
+
+
+def _randomizer(settings: DatasetSettings, table: str) -> random.Random:
+    """Each table has its own random sequence, so tables can be generated one at a time in any order"""
+    return random.Random(f"{settings.seed}:{table}")
+
+
+def iter_companies(settings: DatasetSettings) -> Iterator[dict]:
+    randomizer = _randomizer(settings, CompanyModel.Meta.table)
+    prefixes = ("Air", "Sky", "Jet", "Aero", "Blue", "Nord", "Sun", "Star")
+    for _id in range(1, settings.companies + 1):
+        yield {"id": _id, "name": f"{randomizer.choice(prefixes)}{randomizer.choice(('', ' Air', 'lines'))} {_id}"}
+
+
+def iter_users(settings: DatasetSettings) -> Iterator[dict]:
+    """The first user is ADMIN, so benchmarks can authorize as user 1"""
+    randomizer = _randomizer(settings, UserModel.Meta.table)
+    for _id in range(1, settings.users + 1):
+        is_admin = _id == 1 or randomizer.random() < settings.admin_share
+        yield {
+            "id": _id,
+            "name": f"User {_id}",
+            "role": (UserRoleEnum.ADMIN if is_admin else UserRoleEnum.PASSENGER).value,
+        }
+
+
+def iter_trips(settings: DatasetSettings) -> Iterator[dict]:
+    randomizer = _randomizer(settings, TripModel.Meta.table)
+    planes = list(PlaneEnum)
+    plane_weights = [PLANE_WEIGHTS.get(plane, 1) for plane in planes]
+    # a few hub towns take most of the traffic
+    town_weights = [1 / rank for rank in range(1, len(TOWNS) + 1)]
+    for _id in range(1, settings.trips + 1):
+        town_from, town_to = randomizer.choices(TOWNS, town_weights, k=2)
+        while town_to == town_from:
+            town_to = randomizer.choices(TOWNS, town_weights)[0]
+        time_out = START + timedelta(minutes=randomizer.randrange(525600))
+        yield {
+            "id": _id,
+            "company": randomizer.randint(1, settings.companies),
+            "plane": randomizer.choices(planes, plane_weights)[0].value,
+            "town_from": town_from,
+            "town_to": town_to,
+            "time_out": time_out.isoformat(),
+            "time_in": (time_out + timedelta(minutes=randomizer.randrange(30, 900))).isoformat(),
+        }
+
+
+def iter_tickets(settings: DatasetSettings) -> Iterator[dict]:
+    """Tickets trip by trip, places of one trip don't repeat"""
+    randomizer = _randomizer(settings, PassInTripModel.Meta.table)
+    max_tickets = min(round(settings.tickets_per_trip * 2), len(SEATS))
+    _id = 0
+    for trip in range(1, settings.trips + 1):
+        for place in randomizer.sample(SEATS, randomizer.randint(0, max_tickets)):
+            _id += 1
+            yield {"id": _id, "trip": trip, "passenger": randomizer.randint(1, settings.users), "place": place}
+
+
+def iter_dataset(settings: DatasetSettings) -> dict[str, Iterator[dict]]:
+    """Lazy rows of each table, in order of foreign keys"""
+    return {
+        CompanyModel.Meta.table: iter_companies(settings),
+        UserModel.Meta.table: iter_users(settings),
+        TripModel.Meta.table: iter_trips(settings),
+        PassInTripModel.Meta.table: iter_tickets(settings),
+    }
+
+
+def _columns(table: str) -> list[str]:
+    return next(list(model.__fields__) for model in MODELS if model.Meta.table == table)
+
+
+def _values(table: str, rows: Iterable[dict]) -> Iterator[list]:
+    columns = _columns(table)
+    return ([row[column] for column in columns] for row in rows)
+
+
+def write_sqlite(address: str | Path, tables: Mapping[str, Iterable[dict]]):
+    """
+    Database of init.sql with its rows replaced by `tables`. Rows are loaded without a journal
+    and indexes of migrations are created after them, which is faster than updating them row by row.
+    """
+    with closing(sqlite3.connect(address)) as connection:
+        connection.executescript(INIT_SQL_PATH.read_text(encoding="utf-8"))
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        with connection:
+            for table, rows in tables.items():
+                connection.execute(f"DELETE FROM {table}")
+                columns = _columns(table)
+                connection.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    _values(table, rows),
+                )
+        connection.execute("PRAGMA journal_mode = DELETE")
+        migrate(connection)
+
+
+def write_storage(path: str | Path, tables: Mapping[str, Iterable[dict]], trusted: bool = False):
+    """Storage file of pythonic storage: a trusted snapshot or legacy json, streamed row by row"""
+    if trusted:
+        columnar_tables = {table: (_columns(table), _values(table, rows)) for table, rows in tables.items()}
+        write_trusted_snapshot_rows(path, columnar_tables)
+        return
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("{")
+        for position, (table, rows) in enumerate(tables.items()):
+            file.write(f"{', ' if position else ''}{json.dumps(table)}: [")
+            for row_position, row in enumerate(rows):
+                file.write(f"{', ' if row_position else ''}{json.dumps(row, ensure_ascii=False)}")
+            file.write("]")
+        file.write("}")
+
+
+def _report(path: Path, started_at: float):
+    print(f"{path}: {path.stat().st_size / 2**20:.1f} MiB in {perf_counter() - started_at:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trips", type=int, default=100000)
+    parser.add_argument("--companies", type=int, help="a thousandth of trips by default")
+    parser.add_argument("--users", type=int, help="a tenth of trips by default")
+    parser.add_argument("--tickets-per-trip", type=float, default=3.0)
+    parser.add_argument("--admin-share", type=float, default=0.001)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sqlite", type=Path, help="SQLite database to create")
+    parser.add_argument("--storage", type=Path, help="storage file of pythonic storage to create")
+    parser.add_argument("--trusted", action="store_true", help="write the storage file as a trusted snapshot")
+    args = parser.parse_args()
+    if not args.sqlite and not args.storage:
+        parser.error("nothing to write, give --sqlite or --storage")
+
+    settings = DatasetSettings(
+        trips=args.trips,
+        companies=args.companies or max(args.trips // 1000, 1),
+        users=args.users or max(args.trips // 10, 1),
+        tickets_per_trip=args.tickets_per_trip,
+        admin_share=args.admin_share,
+        seed=args.seed,
+    )
+    if args.sqlite:
+        args.sqlite.unlink(missing_ok=True)
+        started_at = perf_counter()
+        write_sqlite(args.sqlite, iter_dataset(settings))
+        _report(args.sqlite, started_at)
+    if args.storage:
+        started_at = perf_counter()
+        write_storage(args.storage, iter_dataset(settings), args.trusted)
+        _report(args.storage, started_at)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Measures memory taken by in-memory tables of pythonic storage with pydantic models and with compact records,
+and extrapolates it to 1M rows.
+
+    python benchmarks/memory.py --rows 100000
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from startup import make_tables  # noqa: E402
+
+from model.db_entities.models import PassInTripModel, TripModel  # noqa: E402
+from model.storage.pythonic.storage import GenericStorageList  # noqa: E402
+
+
+def measure(build) -> int:
+    """Bytes still allocated after `build` returns, the result is kept alive while measuring"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return allocated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    tables = make_tables(args.rows)
+    print(f"{'table':>14} {'mode':>8} {'bytes/row':>10} {'MiB per 1M rows':>16}")
+    for model in (PassInTripModel, TripModel):
+        rows = tables[model.Meta.table]
+        columns = list(model.__fields__)
+        values = [[row[column] for column in columns] for row in rows]
+        for mode, compact in (("models", False), ("compact", True)):
+            allocated = measure(lambda: GenericStorageList[model].from_columns(columns, values, compact=compact))
+            per_row = allocated / len(rows)
+            print(f"{model.Meta.table:>14} {mode:>8} {per_row:>10.0f} {per_row * 1_000_000 / 2**20:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
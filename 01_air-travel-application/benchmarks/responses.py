@@ -0,0 +1,85 @@
+"""
+Compares latency of list endpoints with trusted output (projection + direct rendering)
+and with the usual response_model validation of the same endpoints.
+
+    python benchmarks/responses.py --rows 10000 --page-size 100
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from asgi import lifespan, request  # noqa: E402
+from startup import make_tables  # noqa: E402
+
+from fastapi.routing import APIRoute  # noqa: E402
+
+from config.settings import AppSettings, DatabaseSettings, Settings  # noqa: E402
+from controller.responses import TrustedOutputRoute  # noqa: E402
+from main import build_app  # noqa: E402
+
+HEADERS = {"Authorization": "Bearer 1"}
+PATHS = ("/companies", "/trips", "/trips/cursor", "/admin/users", "/admin/tickets", "/profile/tickets")
+
+
+def validate_trusted_routes(app):
+    """Replaces trusted routes by plain routes of their original endpoints"""
+    for position, route in enumerate(app.router.routes):
+        if isinstance(route, TrustedOutputRoute) and (endpoint := getattr(route.endpoint, "__wrapped__", None)):
+            app.router.routes[position] = APIRoute(
+                route.path,
+                endpoint,
+                response_model=route.response_model,
+                status_code=route.status_code,
+                dependencies=route.dependencies,
+                methods=route.methods,
+                name=route.name,
+            )
+    return app
+
+
+async def measure(app, url: str, repeat: int) -> tuple[float, bytes]:
+    status, _, body = await request(app, "GET", url, HEADERS)
+    assert status == 200, (url, status, body)
+    started_at = perf_counter()
+    for _ in range(repeat):
+        await request(app, "GET", url, HEADERS)
+    return (perf_counter() - started_at) / repeat, body
+
+
+async def run(settings: Settings, page_size: int, repeat: int):
+    print(f"{'endpoint':>18} {'validated, ms':>14} {'trusted, ms':>12} {'speedup':>8}")
+    async with lifespan(build_app(settings)) as trusted_app, lifespan(
+        validate_trusted_routes(build_app(settings))
+    ) as validated_app:
+        for path in PATHS:
+            url = f"{path}?limit={page_size}" if path.endswith("cursor") else f"{path}?page_size={page_size}"
+            validated, validated_body = await measure(validated_app, url, repeat)
+            trusted, trusted_body = await measure(trusted_app, url, repeat)
+            assert json.loads(validated_body) == json.loads(trusted_body), path
+            print(f"{path:>18} {validated * 1000:>14.2f} {trusted * 1000:>12.2f} {validated / trusted:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        tables = make_tables(args.rows)
+        tables["users"][0]["role"] = "ADMIN"
+        file_path = Path(directory, "storage.json")
+        file_path.write_text(json.dumps(tables), encoding="utf-8")
+        database = DatabaseSettings(database_type="pythonic_storage", file_path=file_path)
+        asyncio.run(run(Settings(AppSettings(), database), args.page_size, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compares mapping of SQLite records into models with `parse_obj` and with the trusted row factory
+on `SELECT * FROM trips` of an in-memory database, with trip timestamps stored as ISO strings and as epochs,
+and compares counting trips in a time window with both formats.
+
+    python benchmarks/rows.py --rows 10000
+"""
+import argparse
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from startup import make_tables, measure  # noqa: E402
+
+from model.db_entities.models import TripModel  # noqa: E402
+from model.storage.raw_sql.schema import convert_timestamps_to_epoch, migrate  # noqa: E402
+from model.storage.raw_sql.utils import bind_epoch_timestamps, parse_db_record_into_model  # noqa: E402
+
+INIT_SQL_PATH = Path(__file__).resolve().parents[1] / "src" / "model" / "storage" / "raw_sql" / "init.sql"
+WINDOW_SQL = "SELECT COUNT(*) FROM trips WHERE time_out >= ? AND time_out <= ?"
+
+
+def make_database(trips: list[dict], epoch_timestamps: bool) -> sqlite3.Connection:
+    connection = sqlite3.connect(":memory:", detect_types=sqlite3.PARSE_DECLTYPES)
+    connection.executescript(INIT_SQL_PATH.read_text())
+    fields = tuple(TripModel.__fields__)[1:]
+    connection.executemany(
+        f"INSERT INTO trips ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})",
+        [tuple(trip[field] for field in fields) for trip in trips],
+    )
+    connection.commit()
+    migrate(connection)
+    if epoch_timestamps:
+        convert_timestamps_to_epoch(connection)
+    return connection
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--window-days", type=int, default=30)
+    args = parser.parse_args()
+
+    trips = make_tables(args.rows)["trips"]
+    window_start = datetime(2023, 6, 1)
+    window = (window_start, window_start + timedelta(days=args.window_days))
+    print(f"{'timestamps':>10} {'mapper':>10} {'rows':>8} {'total, ms':>10} {'us/row':>8}")
+    results = {}
+    for timestamps, epoch_timestamps in (("iso", False), ("epoch", True)):
+        connection = make_database(trips, epoch_timestamps)
+        parameters = bind_epoch_timestamps(window) if epoch_timestamps else window
+
+        def read_rows(trusted: bool) -> list[TripModel]:
+            records = connection.execute("SELECT * FROM trips").fetchall()
+            return [parse_db_record_into_model(record, TripModel, trusted, epoch_timestamps) for record in records]
+
+        results[timestamps] = read_rows(trusted=False), connection.execute(WINDOW_SQL, parameters).fetchone()
+        assert read_rows(trusted=True) == results[timestamps][0]
+        for name, trusted in (("parse_obj", False), ("trusted", True)):
+            elapsed = measure(lambda: read_rows(trusted), args.repeat)
+            per_row = elapsed / len(trips) * 1e6
+            print(f"{timestamps:>10} {name:>10} {len(trips):>8} {elapsed * 1000:>10.1f} {per_row:>8.2f}")
+        results[timestamps] += (
+            measure(lambda: connection.execute(WINDOW_SQL, parameters).fetchone(), args.repeat * 100),
+        )
+        connection.close()
+    assert results["iso"][:2] == results["epoch"][:2]
+
+    print(f"\n{'timestamps':>10} {'window count, us':>17} {'trips in window':>16}")
+    for timestamps, (_, (count,), elapsed) in results.items():
+        print(f"{timestamps:>10} {elapsed * 1e6:>17.1f} {count:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compares cold start of pythonic storage from a legacy json snapshot (validated row by row)
+and from a trusted snapshot (checked once by checksum), for a growing number of rows.
+
+    python benchmarks/startup.py --rows 1000 10000 100000
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from model.enum import PlaneEnum, UserRoleEnum  # noqa: E402
+from model.storage.pythonic.snapshot import write_snapshot_tables  # noqa: E402
+from model.storage.pythonic.storage import Storage  # noqa: E402
+
+
+def make_tables(rows_count: int) -> dict[str, list[dict]]:
+    """`rows_count` trips and tickets, a tenth as many companies and users"""
+    randomizer = random.Random(rows_count)
+    companies_count = users_count = max(rows_count // 10, 1)
+    start = datetime(2023, 1, 1)
+    trips = []
+    for _id in range(1, rows_count + 1):
+        time_out = start + timedelta(minutes=randomizer.randrange(525600))
+        trips.append(
+            {
+                "id": _id,
+                "company": randomizer.randint(1, companies_count),
+                "plane": randomizer.choice(list(PlaneEnum)).value,
+                "town_from": f"Town {randomizer.randrange(100)}",
+                "town_to": f"Town {randomizer.randrange(100)}",
+                "time_out": time_out.isoformat(),
+                "time_in": (time_out + timedelta(minutes=randomizer.randrange(30, 900))).isoformat(),
+            }
+        )
+    return {
+        "companies": [{"id": _id, "name": f"Company {_id}"} for _id in range(1, companies_count + 1)],
+        "trips": trips,
+        "pass_in_trip": [
+            {
+                "id": _id,
+                "trip": randomizer.randint(1, rows_count),
+                "passenger": randomizer.randint(1, users_count),
+                "place": f"{randomizer.choice('ABCDEF')}{randomizer.randint(1, 40)}",
+            }
+            for _id in range(1, rows_count + 1)
+        ],
+        "users": [
+            {"id": _id, "name": f"User {_id}", "role": UserRoleEnum.PASSENGER.value}
+            for _id in range(1, users_count + 1)
+        ],
+    }
+
+
+def measure(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started_at = perf_counter()
+        func()
+        best = min(best, perf_counter() - started_at)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'legacy, s':>12} {'trusted, s':>12} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_path, trusted_path = Path(directory, "legacy.json"), Path(directory, "trusted.json")
+        for rows_count in args.rows:
+            tables = make_tables(rows_count)
+            legacy_path.write_text(json.dumps(tables, indent=4, ensure_ascii=False), encoding="utf-8")
+            write_snapshot_tables(trusted_path, tables, trusted=True)
+            legacy = measure(lambda: Storage.load(legacy_path), args.repeat)
+            trusted = measure(lambda: Storage.load(trusted_path, trusted=True), args.repeat)
+            print(f"{rows_count:>10} {legacy:>12.3f} {trusted:>12.3f} {legacy / trusted:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
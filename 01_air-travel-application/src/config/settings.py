@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 
-from pydantic import BaseSettings, validator
+from pydantic import BaseSettings, PositiveFloat, validator
 
 
 class AppSettings(BaseSettings):
@@ -13,6 +13,15 @@ class AppSettings(BaseSettings):
     HOST: str = "localhost"
     PORT: int = 8000
     ADDRESS: str | None = None
+    AUTH_CACHE_SIZE: int = 1024
+    AUTH_CACHE_TTL: float = 60.0
+    # bodies and ETags of public GET routes, kept valid by writes made through this process only:
+    # with several workers or other writers to the database they are stale for up to RESPONSE_CACHE_TTL seconds
+    RESPONSE_CACHE: bool = False
+    RESPONSE_CACHE_SIZE: int = 1024
+    RESPONSE_CACHE_TTL: PositiveFloat = 5.0
+    # Server-Timing header and a log line with durations of request phases
+    SERVER_TIMING: bool = False
 
     @validator("ADDRESS")
     def check_app_address(cls, value: str | None, values: dict) -> str:
@@ -31,9 +40,36 @@ class DatabaseSettings(BaseSettings):
 
     database_type: DBTypeEnum = "sqlite"
     file_path: str | Path = "model/storage/pythonic/storage.json"
+    # pythonic storage: changes are dropped on shutdown instead of being dumped into file_path
     rollback: bool = True
+    # pythonic storage: changes are logged next to file_path as they are made, it requires rollback to be off
+    write_behind: bool = False
+    write_behind_log_path: str | Path = "model/storage/pythonic/storage.log"
+    compaction_interval: float = 60.0
+    trusted_snapshot: bool = False
+    compact_rows: bool = False
 
     address: str = "model/storage/raw_sql/storage.db"
+    sqlite_pool: bool = False
+    sqlite_pool_size: int = 4
+    sqlite_pool_queue_size: int = 64
+    sqlite_statement_cache_size: int = 128
+    trusted_rows: bool = False
+    # converts ISO strings of trip timestamps into integer epoch microseconds on connect, once for a database
+    sqlite_epoch_timestamps: bool = False
+    # fails on connect if a filter of list endpoints makes SQLite scan the whole table
+    sqlite_verify_query_plans: bool = False
+
+    entity_cache: bool = False
+    entity_cache_sizes: dict[str, int] = {"companies": 1024, "trips": 8192}
+    # writes of other workers or processes are not seen by the entity cache until its entries expire
+    entity_cache_ttl: PositiveFloat = 60.0
+
+    @validator("write_behind")
+    def check_write_behind(cls, value: bool, values: dict) -> bool:
+        if value and values.get("rollback"):
+            raise ValueError("write_behind persists every change, so it can't be combined with rollback")
+        return value
 
 
 @dataclass
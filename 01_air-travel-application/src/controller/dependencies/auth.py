@@ -6,6 +6,7 @@ from starlette import status
 
 from model.enum import UserRoleEnum
 from model.services.crud.user import UserCRUD
+from model.services.timing import timed
 from model.storage.exceptions import EntityNotFoundError
 
 
@@ -22,13 +23,16 @@ async def get_auth_data(
     security: HTTPAuthorizationCredentials = Security(HTTPBearer(description=_description)),
     user_service: UserCRUD = Depends(),
 ) -> AuthData:
-    _id = security.credentials
-    try:
-        user_from_db = await user_service.read_by_id(int(_id))
-    except (ValueError, EntityNotFoundError) as error:
-        raise _auth_error from error
-
-    return AuthData(user_from_db.id, user_from_db.role)
+    async def read_auth_data() -> AuthData:
+        user_from_db = await user_service.read_by_id(_id)
+        return AuthData(user_from_db.id, user_from_db.role)
+
+    with timed("auth"):
+        try:
+            _id = int(security.credentials)
+            return await user_service.auth_cache.get_or_load(_id, read_auth_data)
+        except (ValueError, EntityNotFoundError) as error:
+            raise _auth_error from error
 
 
 def make_auth_dependency(allowed_roles: Collection[UserRoleEnum] = None) -> Callable[[AuthData], AuthData]:
@@ -5,6 +5,8 @@ from typing import Any, Protocol
 
 from pydantic import BaseModel, Extra
 
+from model.services.timing import timed
+
 
 class FilterMap(BaseModel, extra=Extra.forbid):
     eq_: list[tuple[str, Any]] | None = None
@@ -28,12 +30,15 @@ class IsDataclass(Protocol):
 class BaseFilter:
     # ToDO validate fields based on OutputSchema
     def make_filter_map(self: IsDataclass) -> filter_map_typing:
-        filter_map = defaultdict(list)
-        for dataclass_field in self.__dataclass_fields__:
-            if value := getattr(self, dataclass_field):
-                field, filter_type = dataclass_field.split("__")
-                filter_map[filter_type + "_"].append((field, value))
-        return FilterMap(**filter_map).dict(exclude_none=True)
+        with timed("filter"):
+            filter_map = defaultdict(list)
+            for dataclass_field in self.__dataclass_fields__:
+                if value := getattr(self, dataclass_field):
+                    field, filter_type = dataclass_field.split("__")
+                    filter_map[filter_type + "_"].append((field, value))
+            return FilterMap(**filter_map).dict(exclude_none=True)
 
     class Meta:
         schema = None
+        # model of the filtered table, lets the SQLite schema check query plans of the filters
+        model = None
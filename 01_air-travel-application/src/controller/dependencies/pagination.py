@@ -1,4 +1,11 @@
-from typing import NamedTuple
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as DecodeError
+from datetime import datetime
+from typing import Any, Callable, NamedTuple, Sequence
+
+from fastapi import HTTPException, Query
+from starlette import status
 
 
 class Pagination(NamedTuple):
@@ -6,12 +13,64 @@ class Pagination(NamedTuple):
     offset: int = 0
 
 
+class KeysetPagination(NamedTuple):
+    """Page of `limit` rows ordered by `key` fields, which starts right after `after` values of them"""
+
+    limit: int = 10
+    key: tuple[str, ...] = ("id",)
+    after: tuple | None = None
+
+
+pagination_typing = Pagination | KeysetPagination
+
 one_elem = Pagination(1, 0)
 
+MAX_PAGE_LIMIT = 1000
+
+_cursor_error = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
 
 def limit_offset_pagination(limit: int = 10, offset: int = 0) -> Pagination:
     return Pagination(limit=limit, offset=offset)
 
 
-def page_size_pagination(page: int = 1, page_size: int = 10) -> Pagination:
+def page_size_pagination(
+    page: int = Query(1, ge=1), page_size: int = Query(10, ge=1, le=MAX_PAGE_LIMIT)
+) -> Pagination:
     return Pagination(limit=page_size, offset=(page - 1) * page_size)
+
+
+def encode_cursor(key: tuple[str, ...], values: Sequence) -> str:
+    return urlsafe_b64encode(json.dumps([key, values], default=str).encode()).decode()
+
+
+def make_next_cursor(pagination: KeysetPagination, items: Sequence) -> str | None:
+    """Cursor pointing after the last item, None if there are no more items"""
+    if not items or len(items) < pagination.limit:
+        return None
+    return encode_cursor(pagination.key, [getattr(items[-1], field) for field in pagination.key])
+
+
+def make_keyset_pagination(*key: tuple[str, Callable[[Any], Any]]) -> Callable[[int, str | None], KeysetPagination]:
+    """Makes dependency for opaque cursors over `key` fields, each of them is parsed by paired function"""
+    key_fields = tuple(field for field, _ in key)
+
+    def keyset_pagination(
+        limit: int = Query(10, ge=1, le=MAX_PAGE_LIMIT), cursor: str | None = None
+    ) -> KeysetPagination:
+        if cursor is None:
+            return KeysetPagination(limit=limit, key=key_fields)
+        try:
+            cursor_key, values = json.loads(urlsafe_b64decode(cursor.encode()))
+            if tuple(cursor_key) != key_fields or len(values) != len(key):
+                raise ValueError(cursor_key)
+            after = tuple(parse(value) for (_, parse), value in zip(key, values))
+        except (DecodeError, TypeError, ValueError) as error:
+            raise _cursor_error from error
+        return KeysetPagination(limit=limit, key=key_fields, after=after)
+
+    return keyset_pagination
+
+
+id_keyset_pagination = make_keyset_pagination(("id", int))
+time_out_keyset_pagination = make_keyset_pagination(("time_out", datetime.fromisoformat), ("id", int))
@@ -0,0 +1,95 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from starlette import status
+
+from model.services.crud.base import BulkResult
+
+logger = logging.getLogger(__name__)
+
+MAX_LINE_LENGTH = 64 * 1024
+MAX_REPORTED_ERRORS = 100
+
+_line_too_long_error = HTTPException(
+    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Line is longer than {MAX_LINE_LENGTH} bytes"
+)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Lines of a streamed body, only the incomplete line at the end of the current chunk is buffered"""
+    tail = b""
+    async for chunk in chunks:
+        *lines, tail = (tail + chunk).split(b"\n")
+        if len(tail) > MAX_LINE_LENGTH:
+            raise _line_too_long_error
+        for line in lines:
+            if len(line) > MAX_LINE_LENGTH:
+                raise _line_too_long_error
+            yield line
+    if tail:
+        yield tail
+
+
+@dataclass
+class ImportSummary:
+    lines: int = 0
+    created: int = 0
+    failed: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+    def add_error(self, line: int, detail: Any):
+        """Every error is counted, but only the first MAX_REPORTED_ERRORS are kept"""
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "detail": detail})
+
+
+async def import_ndjson(
+    lines: AsyncIterator[bytes],
+    schema: Type[BaseModel],
+    create_many: Callable[[list[dict]], Awaitable[BulkResult]],
+    chunk_size: int,
+    name: str,
+) -> ImportSummary:
+    """
+    Validates NDJSON `lines` one by one by `schema` and creates valid items in chunks of `chunk_size`.
+    The next line is read only after the current chunk is written, so a slow database holds back the client
+    instead of buffering the body. Errors are reported by line number, starting from 1.
+    """
+    summary = ImportSummary()
+    chunk: list[dict] = []
+    chunk_lines: list[int] = []
+
+    async def create_chunk():
+        result = await create_many(chunk)
+        summary.created += len(result.items)
+        for error in result.errors:
+            summary.add_error(chunk_lines[error.index], error.detail)
+        chunk.clear()
+        chunk_lines.clear()
+        logger.info(
+            "Import of %s: %d lines read, %d created, %d failed", name, summary.lines, summary.created, summary.failed
+        )
+
+    async for line in lines:
+        summary.lines += 1
+        if not line.strip():
+            continue
+        try:
+            chunk.append(schema.parse_raw(line).dict())
+        except ValidationError as error:
+            summary.add_error(summary.lines, error.errors())
+            continue
+        except (TypeError, ValueError) as error:
+            # a bad line fails only itself, whatever the schema raises for it
+            summary.add_error(summary.lines, str(error))
+            continue
+        chunk_lines.append(summary.lines)
+        if len(chunk) >= chunk_size:
+            await create_chunk()
+    if chunk:
+        await create_chunk()
+    return summary
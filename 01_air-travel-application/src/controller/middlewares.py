@@ -0,0 +1,148 @@
+import hashlib
+import logging
+import os
+from time import monotonic, perf_counter
+from typing import NamedTuple
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from model.services.cache import LRUCache
+from model.services.timing import RequestTimings, collect_request_timings
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse(NamedTuple):
+    etag: bytes
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+class ResponseCacheMiddleware:
+    """
+    Caches encoded bodies of GET responses of public `routes`, each route prefix is mapped to tables it reads.
+    Cached body and its ETag are valid while versions of these tables in the database handler are unchanged,
+    so a request with matching If-None-Match gets 304 and others get the cached bytes, without calling the route.
+    Responses without content-length are streamed, they are passed through as is.
+    Versions count only writes made through this process, so changes of other workers or of any other writer
+    to the database are seen only when bodies and tags expire: both are kept for at most `ttl` seconds.
+    """
+
+    def __init__(self, app: ASGIApp, routes: dict[str, tuple[str, ...]], maxsize: int = 1024, ttl: float = 5.0):
+        self.app = app
+        self.routes = routes
+        self.ttl = ttl
+        self.cache = LRUCache(maxsize, ttl)
+        # versions start from zero on every start, so tags of the previous process must not match
+        self._epoch = os.urandom(8).hex()
+
+    def _match_tables(self, path: str) -> tuple[str, ...] | None:
+        for prefix, tables in self.routes.items():
+            if path == prefix or path.startswith(prefix + "/"):
+                return tables
+        return None
+
+    def _make_etag(self, key: tuple[str, str], versions: tuple[int, ...]) -> bytes:
+        # tags change every ttl seconds, so clients revalidate against the database at least that often
+        ttl_window = int(monotonic() // self.ttl)
+        digest = hashlib.blake2b(repr((key, versions, ttl_window)).encode(), digest_size=12).hexdigest()
+        return f'"{self._epoch}-{digest}"'.encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not (tables := self._match_tables(scope["path"])):
+            await self.app(scope, receive, send)
+            return
+        table_versions = scope["app"].state.db_connection.table_versions
+        versions = tuple(table_versions[table] for table in tables)
+        # order of query parameters doesn't change the result, so it doesn't make another key
+        key = scope["path"], urlencode(sorted(parse_qsl(scope["query_string"].decode(), keep_blank_values=True)))
+        etag = self._make_etag(key, versions)
+
+        if etag in dict(scope["headers"]).get(b"if-none-match", b"").replace(b" ", b"").split(b","):
+            await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", etag)]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        if (cached := self.cache.get(key)) is not None and cached.etag == etag:
+            await send({"type": "http.response.start", "status": cached.status, "headers": cached.headers})
+            await send({"type": "http.response.body", "body": cached.body})
+            return
+
+        start_message: Message = {}
+        chunks: list[bytes] = []
+        cacheable = False
+
+        async def send_with_etag(message: Message):
+            nonlocal start_message, cacheable
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", ())
+                if cacheable := message["status"] == 200 and any(name == b"content-length" for name, _ in headers):
+                    message = {**message, "headers": [*headers, (b"etag", etag)]}
+                start_message = message
+            elif message["type"] == "http.response.body" and cacheable:
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+        if cacheable and versions == tuple(table_versions[table] for table in tables):
+            self.cache.set(key, CachedResponse(etag, 200, start_message["headers"], b"".join(chunks)))
+
+
+def _format_server_timing(timings: RequestTimings, total: float) -> bytes:
+    """
+    Phases in milliseconds with their counts in desc, "app" is the time outside of them: routing, resolution
+    of dependencies, parsing of the request, and validation and rendering of responses of not trusted routes
+    """
+    metrics = [
+        f'{phase};dur={duration * 1000:.3f};desc="{timings.counts[phase]}"'
+        for phase, duration in timings.durations.items()
+    ]
+    metrics.append(f"app;dur={(total - sum(timings.durations.values())) * 1000:.3f}")
+    metrics.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(metrics).encode()
+
+
+class ServerTimingMiddleware:
+    """
+    Collects durations of request phases timed by model.services.timing and sends them in the Server-Timing header,
+    which covers the request up to the start of the response. The log line written after the response is sent
+    covers the whole request, including phases of a streamed body.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 0
+
+        async def send_with_timing(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                server_timing = _format_server_timing(timings, perf_counter() - started_at)
+                message = {**message, "headers": [*message.get("headers", ()), (b"server-timing", server_timing)]}
+            await send(message)
+
+        started_at = perf_counter()
+        with collect_request_timings() as timings:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                total = perf_counter() - started_at
+                phases = " ".join(
+                    f"{phase}={duration * 1000:.3f}ms/{timings.counts[phase]}"
+                    for phase, duration in timings.durations.items()
+                )
+                logger.info(
+                    "%s %s %d total=%.3fms %s",
+                    scope["method"],
+                    scope["path"],
+                    status,
+                    total * 1000,
+                    phases,
+                    extra={"timings": timings.as_dict(), "total_ms": round(total * 1000, 3)},
+                )
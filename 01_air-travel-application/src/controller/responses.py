@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from functools import wraps
+from typing import Any, AsyncIterator, Callable, Iterable, Type
+
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, StreamingResponse
+
+from controller.schemas.utils import make_schema_projector
+from model.services.timing import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def render_json(content: Any) -> bytes:
+    """Renders plain content straight to bytes, with orjson when it is installed"""
+    if orjson:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+class TrustedJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return render_json(content)
+
+
+def trusted_output(endpoint: Callable) -> Callable:
+    """
+    Marks route whose endpoint returns data built from trusted storage rows:
+    TrustedOutputRoute projects it on response_model and renders it without FastAPI response validation
+    """
+    endpoint.__trusted_output__ = True
+    return endpoint
+
+
+class TrustedOutputRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        response_model = kwargs.get("response_model")
+        if (
+            getattr(endpoint, "__trusted_output__", False)
+            and response_model is not None
+            and not isinstance(response_model, DefaultPlaceholder)
+        ):
+            endpoint = self._wrap_trusted_endpoint(endpoint, response_model, kwargs.get("status_code") or 200)
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def _wrap_trusted_endpoint(endpoint: Callable, response_model: Any, status_code: int) -> Callable:
+        project = make_schema_projector(response_model)
+
+        @wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            result = await endpoint(*args, **kwargs)
+            with timed("render"):
+                return TrustedJSONResponse(project(result), status_code=status_code)
+
+        # routes are copied with their endpoint on include_router, so the wrapper must not be wrapped again
+        wrapper.__trusted_output__ = False
+        return wrapper
+
+
+class ExportFormatEnum(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+_export_media_types = {ExportFormatEnum.ndjson: "application/x-ndjson", ExportFormatEnum.csv: "text/csv"}
+
+
+def _make_csv_columns(schema: Type[BaseModel], prefix: str = "") -> list[str]:
+    """Nested schemas are flattened into dotted columns, e.g. company.name"""
+    columns = []
+    for name, field in schema.__fields__.items():
+        if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+            columns.extend(_make_csv_columns(field.type_, f"{prefix}{name}."))
+        else:
+            columns.append(prefix + name)
+    return columns
+
+
+def _flatten_csv_row(item: dict, prefix: str = "") -> Iterable[tuple[str, Any]]:
+    for name, value in item.items():
+        match value:
+            case dict():
+                yield from _flatten_csv_row(value, f"{prefix}{name}.")
+            case datetime():
+                yield prefix + name, value.isoformat()
+            case Enum():
+                yield prefix + name, value.value
+            case _:
+                yield prefix + name, value
+
+
+async def _render_ndjson(batches: AsyncIterator[list], project: Callable[[Any], Any]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield b"".join(render_json(project(item)) + b"\n" for item in batch)
+
+
+async def _render_csv(
+    batches: AsyncIterator[list], project: Callable[[Any], Any], columns: list[str]
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, columns)
+    writer.writeheader()
+    async for batch in batches:
+        writer.writerows(dict(_flatten_csv_row(project(item))) for item in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
+async def _prepend(first_batch: list | None, batches: AsyncIterator[list]) -> AsyncIterator[list]:
+    if first_batch is not None:
+        yield first_batch
+    async for batch in batches:
+        yield batch
+
+
+async def make_export_response(
+    batches: AsyncIterator[list], output_schema: Type[BaseModel], export_format: ExportFormatEnum, name: str
+) -> StreamingResponse:
+    """
+    Streams trusted objects of `batches` projected on `output_schema` as NDJSON lines or CSV rows,
+    one chunk per batch, so only the current batch is held in memory.
+    The first batch is fetched before the response starts, so an error of the query gets its own status code.
+    """
+    batches = _prepend(await anext(batches, None), batches)
+    project = make_schema_projector(output_schema)
+    if export_format is ExportFormatEnum.csv:
+        content = _render_csv(batches, project, _make_csv_columns(output_schema))
+    else:
+        content = _render_ndjson(batches, project)
+    return StreamingResponse(
+        content,
+        media_type=_export_media_types[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format.value}"'},
+    )
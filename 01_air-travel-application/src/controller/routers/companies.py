@@ -1,16 +1,20 @@
 from dataclasses import dataclass
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Body, Depends, Query
+from pydantic import conint
 from starlette import status
 
 from controller.dependencies.auth import admin_only_permission
 from controller.dependencies.filters import BaseFilter
 from controller.dependencies.pagination import Pagination, page_size_pagination
-from controller.schemas.input import CompanyInputSchema, CompanyUpdateSchema
-from controller.schemas.output import CompanyOutputSchema
+from controller.responses import TrustedOutputRoute, trusted_output
+from controller.schemas.input import CompanyBulkUpdateSchema, CompanyInputSchema, CompanyUpdateSchema
+from controller.schemas.output import BulkOutputSchema, CompanyOutputSchema
+from controller.schemas.utils import make_bulk_output, validate_bulk_items
+from model.db_entities.models import CompanyModel
 from model.services.crud.company import CompanyCRUD
 
-router = APIRouter(prefix="/companies", tags=["Company"])
+router = APIRouter(prefix="/companies", tags=["Company"], route_class=TrustedOutputRoute)
 
 
 @dataclass
@@ -19,8 +23,12 @@ class CompanyFilter(BaseFilter):
     id__in: list[int] | None = Query(None, description="filter by inclusion in id list", alias="ids")
     name__like: str | None = Query(None, description="filter by name", alias="name")
 
+    class Meta(BaseFilter.Meta):
+        model = CompanyModel
+
 
 @router.get("", response_model=list[CompanyOutputSchema])
+@trusted_output
 async def get_companies(
     pagination: Pagination = Depends(page_size_pagination),
     _filter: CompanyFilter = Depends(),
@@ -31,11 +39,40 @@ async def get_companies(
 
 @router.get("/count", response_model=int)
 async def get_companies_count(
-    pagination: Pagination = Depends(page_size_pagination),
     _filter: CompanyFilter = Depends(),
     service: CompanyCRUD = Depends(),
 ):
-    return len(await service.read(_filter.make_filter_map(), pagination))
+    return await service.count(_filter.make_filter_map())
+
+
+@router.post("/bulk", response_model=BulkOutputSchema[CompanyOutputSchema])
+async def add_companies(
+    items: list[dict] = Body(...), service: CompanyCRUD = Depends(), __auth=Depends(admin_only_permission)
+):
+    """Creates valid companies of the list at once, errors of other items are reported by their index"""
+    indexes, valid_items, errors = validate_bulk_items(CompanyInputSchema, items)
+    result = await service.create_many([item.dict() for item in valid_items])
+    return make_bulk_output(indexes, result, errors)
+
+
+@router.patch("/bulk", response_model=BulkOutputSchema[CompanyOutputSchema])
+async def edit_companies(
+    items: list[dict] = Body(...), service: CompanyCRUD = Depends(), __auth=Depends(admin_only_permission)
+):
+    """Updates companies by ids given in items at once, errors of other items are reported by their index"""
+    indexes, valid_items, errors = validate_bulk_items(CompanyBulkUpdateSchema, items)
+    result = await service.update_many(
+        [(item.id, item.dict(exclude={"id"}, exclude_none=True)) for item in valid_items]
+    )
+    return make_bulk_output(indexes, result, errors)
+
+
+@router.delete("/bulk", response_model=BulkOutputSchema[int])
+async def delete_companies(
+    ids: list[conint(gt=0)] = Body(...), service: CompanyCRUD = Depends(), __auth=Depends(admin_only_permission)
+):
+    """Deletes companies by ids at once, items are ids of deleted companies, missing ones are reported by their index"""
+    return make_bulk_output(list(range(len(ids))), await service.delete_many(ids), {})
 
 
 @router.get("/{_id}", response_model=CompanyOutputSchema)
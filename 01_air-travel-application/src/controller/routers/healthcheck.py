@@ -1,4 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from controller.dependencies.auth import admin_only_permission
+from model.services.cache import LRUCache, get_auth_cache
+from model.storage.base import BaseDatabaseHandler
+from model.storage.connection import get_db_connection
 
 router = APIRouter(prefix="/healthcheck", tags=["healthcheck"])
 
@@ -6,3 +11,13 @@ router = APIRouter(prefix="/healthcheck", tags=["healthcheck"])
 @router.get("/ping")
 async def healthcheck():
     return "pong"
+
+
+@router.get("/metrics")
+async def metrics(
+    db_conn: BaseDatabaseHandler = Depends(get_db_connection),
+    auth_cache: LRUCache = Depends(get_auth_cache),
+    __auth=Depends(admin_only_permission),
+):
+    """Pool, statement and cache statistics, they tell about the load and the data, so only admins see them"""
+    return {"database": db_conn.metrics(), "auth_cache": auth_cache.stats.as_dict()}
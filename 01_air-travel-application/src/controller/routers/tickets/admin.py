@@ -1,16 +1,37 @@
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Body, Depends, Query, Request
+from pydantic import conint
 from starlette import status
 
 from controller.dependencies.auth import admin_only_permission
+from controller.imports import import_ndjson, iter_lines
 from controller.dependencies.filters import BaseFilter
-from controller.dependencies.pagination import page_size_pagination, Pagination
-from controller.schemas.input import TicketAdminInputSchema, TicketAdminUpdateSchema
-from controller.schemas.output import TicketAdminOutputSchema
+from controller.dependencies.pagination import (
+    KeysetPagination,
+    Pagination,
+    id_keyset_pagination,
+    make_next_cursor,
+    page_size_pagination,
+)
+from controller.responses import ExportFormatEnum, TrustedOutputRoute, make_export_response, trusted_output
+from controller.schemas.input import TicketAdminBulkUpdateSchema, TicketAdminInputSchema, TicketAdminUpdateSchema
+from controller.schemas.output import (
+    BulkOutputSchema,
+    CursorPageOutputSchema,
+    ImportOutputSchema,
+    TicketAdminOutputSchema,
+)
+from controller.schemas.utils import make_bulk_output, validate_bulk_items
+from model.db_entities.models import PassInTripModel
 from model.services.crud.ticket import TicketCRUD
 
-router = APIRouter(prefix="/admin/tickets", tags=["Ticket Admin"], dependencies=[Depends(admin_only_permission)])
+router = APIRouter(
+    prefix="/admin/tickets",
+    tags=["Ticket Admin"],
+    dependencies=[Depends(admin_only_permission)],
+    route_class=TrustedOutputRoute,
+)
 
 
 @dataclass
@@ -18,8 +39,12 @@ class AdminTicketFilter(BaseFilter):
     trip__eq: int | None = Query(None, description="filter by trip id", alias="trip")
     trip__in: list[int] | None = Query(None, description="filter by inclusion in trip id list", alias="trips")
 
+    class Meta(BaseFilter.Meta):
+        model = PassInTripModel
+
 
 @router.get("", response_model=list[TicketAdminOutputSchema])
+@trusted_output
 async def get_tickets(
     pagination: Pagination = Depends(page_size_pagination),
     _filter: AdminTicketFilter = Depends(),
@@ -30,11 +55,70 @@ async def get_tickets(
 
 @router.get("/count", response_model=int)
 async def get_tickets_count(
-    pagination: Pagination = Depends(page_size_pagination),
     _filter: AdminTicketFilter = Depends(),
     service: TicketCRUD = Depends(),
 ):
-    return len(await service.read(_filter.make_filter_map(), pagination))
+    return await service.count(_filter.make_filter_map())
+
+
+@router.get("/cursor", response_model=CursorPageOutputSchema[TicketAdminOutputSchema])
+@trusted_output
+async def get_tickets_page(
+    pagination: KeysetPagination = Depends(id_keyset_pagination),
+    _filter: AdminTicketFilter = Depends(),
+    service: TicketCRUD = Depends(),
+):
+    """Tickets ordered by id, next page is requested with next_cursor of the current one"""
+    items = await service.read(_filter.make_filter_map(), pagination)
+    return {"items": items, "next_cursor": make_next_cursor(pagination, items)}
+
+
+@router.get("/export")
+async def export_tickets(
+    export_format: ExportFormatEnum = Query(ExportFormatEnum.ndjson, alias="format"),
+    _filter: AdminTicketFilter = Depends(),
+    service: TicketCRUD = Depends(),
+):
+    """All tickets matching the filter ordered by id, streamed as NDJSON lines or CSV rows"""
+    return await make_export_response(
+        service.read_batches(_filter.make_filter_map()), TicketAdminOutputSchema, export_format, "tickets"
+    )
+
+
+@router.post("/bulk", response_model=BulkOutputSchema[TicketAdminOutputSchema])
+async def add_tickets(items: list[dict] = Body(...), service: TicketCRUD = Depends()):
+    """Creates valid tickets of the list at once, errors of other items are reported by their index"""
+    indexes, valid_items, errors = validate_bulk_items(TicketAdminInputSchema, items)
+    result = await service.create_many([item.dict() for item in valid_items])
+    return make_bulk_output(indexes, result, errors)
+
+
+@router.patch("/bulk", response_model=BulkOutputSchema[TicketAdminOutputSchema])
+async def edit_tickets(items: list[dict] = Body(...), service: TicketCRUD = Depends()):
+    """Updates tickets by ids given in items at once, errors of other items are reported by their index"""
+    indexes, valid_items, errors = validate_bulk_items(TicketAdminBulkUpdateSchema, items)
+    result = await service.update_many(
+        [(item.id, item.dict(exclude={"id"}, exclude_none=True)) for item in valid_items]
+    )
+    return make_bulk_output(indexes, result, errors)
+
+
+@router.delete("/bulk", response_model=BulkOutputSchema[int])
+async def delete_tickets(ids: list[conint(gt=0)] = Body(...), service: TicketCRUD = Depends()):
+    """Deletes tickets by ids at once, items are ids of deleted tickets, missing ones are reported by their index"""
+    return make_bulk_output(list(range(len(ids))), await service.delete_many(ids), {})
+
+
+@router.post("/import", response_model=ImportOutputSchema)
+async def import_tickets(
+    request: Request,
+    chunk_size: conint(gt=0, le=10000) = Query(500, description="number of tickets created in one transaction"),
+    service: TicketCRUD = Depends(),
+):
+    """Creates tickets from NDJSON body, one ticket per line, the body is read as a stream"""
+    lines = iter_lines(request.stream())
+    summary = await import_ndjson(lines, TicketAdminInputSchema, service.create_many, chunk_size, "tickets")
+    return asdict(summary)
 
 
 @router.get("/{_id}", response_model=TicketAdminOutputSchema)
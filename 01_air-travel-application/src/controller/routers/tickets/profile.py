@@ -6,11 +6,12 @@ from starlette import status
 from controller.dependencies.auth import auth_only_permission, AuthData
 from controller.dependencies.filters import BaseFilter, filter_map_typing
 from controller.dependencies.pagination import page_size_pagination, Pagination
+from controller.responses import TrustedOutputRoute, trusted_output
 from controller.schemas.input import TicketProfileInputSchema
 from controller.schemas.output import TicketProfileOutputSchema
 from model.services.crud.ticket import TicketCRUD
 
-router = APIRouter(prefix="/profile/tickets", tags=["Ticket profile"])
+router = APIRouter(prefix="/profile/tickets", tags=["Ticket profile"], route_class=TrustedOutputRoute)
 
 
 @dataclass
@@ -27,6 +28,7 @@ class ProfileTicketFilter(BaseFilter):
 
 
 @router.get("", response_model=list[TicketProfileOutputSchema])
+@trusted_output
 async def get_tickets(
     pagination: Pagination = Depends(page_size_pagination),
     _filter: ProfileTicketFilter = Depends(),
@@ -38,12 +40,11 @@ async def get_tickets(
 
 @router.get("/count", response_model=int)
 async def get_tickets_count(
-    pagination: Pagination = Depends(page_size_pagination),
     _filter: ProfileTicketFilter = Depends(),
     service: TicketCRUD = Depends(),
     user: AuthData = Depends(auth_only_permission),
 ):
-    return len(await service.read(_filter.make_profile_filter_map(user.id), pagination))
+    return await service.count(_filter.make_profile_filter_map(user.id))
 
 
 @router.get("/{_id}", response_model=TicketProfileOutputSchema)
@@ -1,19 +1,29 @@
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, Query
-from pydantic import constr
+from fastapi import APIRouter, Body, Depends, Query, Request
+from pydantic import conint, constr
 from starlette import status
 
 from controller.dependencies.auth import admin_only_permission
+from controller.imports import import_ndjson, iter_lines
 from controller.dependencies.filters import BaseFilter
-from controller.dependencies.pagination import page_size_pagination, Pagination
-from controller.schemas.input import TripInputSchema, TripUpdateSchema
-from controller.schemas.output import TripOutputSchema
+from controller.dependencies.pagination import (
+    KeysetPagination,
+    Pagination,
+    make_next_cursor,
+    page_size_pagination,
+    time_out_keyset_pagination,
+)
+from controller.responses import ExportFormatEnum, TrustedOutputRoute, make_export_response, trusted_output
+from controller.schemas.input import TripBulkUpdateSchema, TripInputSchema, TripUpdateSchema
+from controller.schemas.output import BulkOutputSchema, CursorPageOutputSchema, ImportOutputSchema, TripOutputSchema
+from controller.schemas.utils import make_bulk_output, validate_bulk_items
+from model.db_entities.models import TripModel
 from model.enum import PlaneEnum
 from model.services.crud.trip import TripCRUD
 
-router = APIRouter(prefix="/trips", tags=["Trip"])
+router = APIRouter(prefix="/trips", tags=["Trip"], route_class=TrustedOutputRoute)
 
 
 @dataclass
@@ -33,8 +43,12 @@ class TripFilter(BaseFilter):
     time_in__le: datetime | None = Query(None, description="filter by trips <= time_in", alias="time_in_le")
     time_in__ge: datetime | None = Query(None, description="filter by trips >= time_in", alias="time_in_ge")
 
+    class Meta(BaseFilter.Meta):
+        model = TripModel
+
 
 @router.get("", response_model=list[TripOutputSchema])
+@trusted_output
 async def get_trips(
     pagination: Pagination = Depends(page_size_pagination),
     _filter: TripFilter = Depends(),
@@ -45,11 +59,78 @@ async def get_trips(
 
 @router.get("/count", response_model=int)
 async def get_trips_count(
-    pagination: Pagination = Depends(page_size_pagination),
     _filter: TripFilter = Depends(),
     service: TripCRUD = Depends(),
 ):
-    return len(await service.read(_filter.make_filter_map(), pagination))
+    return await service.count(_filter.make_filter_map())
+
+
+@router.get("/cursor", response_model=CursorPageOutputSchema[TripOutputSchema])
+@trusted_output
+async def get_trips_page(
+    pagination: KeysetPagination = Depends(time_out_keyset_pagination),
+    _filter: TripFilter = Depends(),
+    service: TripCRUD = Depends(),
+):
+    """Trips ordered by time_out, next page is requested with next_cursor of the current one"""
+    items = await service.read(_filter.make_filter_map(), pagination)
+    return {"items": items, "next_cursor": make_next_cursor(pagination, items)}
+
+
+@router.get("/export")
+async def export_trips(
+    export_format: ExportFormatEnum = Query(ExportFormatEnum.ndjson, alias="format"),
+    _filter: TripFilter = Depends(),
+    service: TripCRUD = Depends(),
+    __auth=Depends(admin_only_permission),
+):
+    """All trips matching the filter ordered by id, streamed as NDJSON lines or CSV rows"""
+    return await make_export_response(
+        service.read_batches(_filter.make_filter_map()), TripOutputSchema, export_format, "trips"
+    )
+
+
+@router.post("/bulk", response_model=BulkOutputSchema[TripOutputSchema])
+async def add_trips(
+    items: list[dict] = Body(...), service: TripCRUD = Depends(), __auth=Depends(admin_only_permission)
+):
+    """Creates valid trips of the list at once, errors of other items are reported by their index"""
+    indexes, valid_items, errors = validate_bulk_items(TripInputSchema, items)
+    result = await service.create_many([item.dict() for item in valid_items])
+    return make_bulk_output(indexes, result, errors)
+
+
+@router.patch("/bulk", response_model=BulkOutputSchema[TripOutputSchema])
+async def edit_trips(
+    items: list[dict] = Body(...), service: TripCRUD = Depends(), __auth=Depends(admin_only_permission)
+):
+    """Updates trips by ids given in items at once, errors of other items are reported by their index"""
+    indexes, valid_items, errors = validate_bulk_items(TripBulkUpdateSchema, items)
+    result = await service.update_many(
+        [(item.id, item.dict(exclude={"id"}, exclude_none=True)) for item in valid_items]
+    )
+    return make_bulk_output(indexes, result, errors)
+
+
+@router.delete("/bulk", response_model=BulkOutputSchema[int])
+async def delete_trips(
+    ids: list[conint(gt=0)] = Body(...), service: TripCRUD = Depends(), __auth=Depends(admin_only_permission)
+):
+    """Deletes trips by ids at once, items are ids of deleted trips, missing ones are reported by their index"""
+    return make_bulk_output(list(range(len(ids))), await service.delete_many(ids), {})
+
+
+@router.post("/import", response_model=ImportOutputSchema)
+async def import_trips(
+    request: Request,
+    chunk_size: conint(gt=0, le=10000) = Query(500, description="number of trips created in one transaction"),
+    service: TripCRUD = Depends(),
+    __auth=Depends(admin_only_permission),
+):
+    """Creates trips from NDJSON body, one trip per line, the body is read as a stream"""
+    lines = iter_lines(request.stream())
+    summary = await import_ndjson(lines, TripInputSchema, service.create_many, chunk_size, "trips")
+    return asdict(summary)
 
 
 @router.get("/{_id}", response_model=TripOutputSchema)
@@ -7,12 +7,19 @@ from starlette import status
 from controller.dependencies.auth import admin_only_permission
 from controller.dependencies.filters import BaseFilter
 from controller.dependencies.pagination import page_size_pagination, Pagination
+from controller.responses import TrustedOutputRoute, trusted_output
 from controller.schemas.input import UserAdminInputSchema, UserAdminUpdateSchema
 from controller.schemas.output import UserAdminOutputSchema
+from model.db_entities.models import UserModel
 from model.enum import UserRoleEnum
 from model.services.crud.user import UserCRUD
 
-router = APIRouter(prefix="/admin/users", tags=["User admin"], dependencies=[Depends(admin_only_permission)])
+router = APIRouter(
+    prefix="/admin/users",
+    tags=["User admin"],
+    dependencies=[Depends(admin_only_permission)],
+    route_class=TrustedOutputRoute,
+)
 
 
 @dataclass
@@ -21,8 +28,12 @@ class UserFilter(BaseFilter):
     role__in: list[UserRoleEnum] | None = Query(None, description="filter by inclusion in role list", alias="roles")
     name__like: constr(min_length=1, max_length=64) | None = Query(None, description="filter by name", alias="name")
 
+    class Meta(BaseFilter.Meta):
+        model = UserModel
+
 
 @router.get("", response_model=list[UserAdminOutputSchema])
+@trusted_output
 async def get_users(
     pagination: Pagination = Depends(page_size_pagination),
     _filter: UserFilter = Depends(),
@@ -33,11 +44,10 @@ async def get_users(
 
 @router.get("/count", response_model=int)
 async def get_users_count(
-    pagination: Pagination = Depends(page_size_pagination),
     _filter: UserFilter = Depends(),
     service: UserCRUD = Depends(),
 ):
-    return len(await service.read(_filter.make_filter_map(), pagination))
+    return await service.count(_filter.make_filter_map())
 
 
 @router.get("/{_id}", response_model=UserAdminOutputSchema)
@@ -3,7 +3,7 @@ from datetime import datetime
 from pydantic import BaseModel, constr, conint, validator
 
 from model.enum import PlaneEnum, UserRoleEnum
-from .utils import make_update_schema
+from .utils import make_bulk_update_schema, make_update_schema
 
 
 class CompanyInputSchema(BaseModel):
@@ -20,12 +20,13 @@ class TripInputSchema(BaseModel):
 
     @validator("town_to", allow_reuse=True)
     def check_town_pre(cls, value: str, values: dict):
-        assert value != values["town_from"], "Trips to the same town shouldn't be planned"
+        # town_from is missing from values if it failed validation itself
+        assert value != values.get("town_from"), "Trips to the same town shouldn't be planned"
         return value
 
     @validator("time_in", allow_reuse=True)
     def check_time(cls, value: datetime, values: dict):
-        assert value > values["time_out"], "Time out must be lesser than time in"
+        assert "time_out" not in values or value > values["time_out"], "Time out must be lesser than time in"
         return value
 
 
@@ -55,3 +56,7 @@ TicketProfileUpdateSchema = make_update_schema(TicketProfileInputSchema)
 UserProfileUpdateSchema = make_update_schema(UserProfileInputSchema)
 TicketAdminUpdateSchema = make_update_schema(TicketAdminInputSchema)
 UserAdminUpdateSchema = make_update_schema(UserAdminInputSchema)
+
+CompanyBulkUpdateSchema = make_bulk_update_schema(CompanyUpdateSchema)
+TripBulkUpdateSchema = make_bulk_update_schema(TripUpdateSchema)
+TicketAdminBulkUpdateSchema = make_bulk_update_schema(TicketAdminUpdateSchema)
@@ -1,9 +1,14 @@
 from datetime import datetime
+from typing import Any, Generic, TypeVar
 
 from pydantic import BaseModel
+from pydantic.generics import GenericModel
 
 from model.enum import UserRoleEnum
 
+ItemVar = TypeVar("ItemVar", bound=BaseModel)
+ResultVar = TypeVar("ResultVar")
+
 
 class CompanyOutputSchema(BaseModel):
     id: int
@@ -42,3 +47,30 @@ class TicketAdminOutputSchema(BaseModel):
     place: str
     trip: TripOutputSchema
     passenger: UserAdminOutputSchema
+
+
+class CursorPageOutputSchema(GenericModel, Generic[ItemVar]):
+    items: list[ItemVar]
+    next_cursor: str | None
+
+
+class BulkItemErrorSchema(BaseModel):
+    index: int
+    detail: Any
+
+
+class BulkOutputSchema(GenericModel, Generic[ResultVar]):
+    items: list[ResultVar]
+    errors: list[BulkItemErrorSchema]
+
+
+class ImportLineErrorSchema(BaseModel):
+    line: int
+    detail: Any
+
+
+class ImportOutputSchema(BaseModel):
+    lines: int
+    created: int
+    failed: int
+    errors: list[ImportLineErrorSchema]
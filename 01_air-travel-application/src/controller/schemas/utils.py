@@ -1,7 +1,8 @@
-from functools import lru_cache
-from typing import Type
+from functools import lru_cache, partial
+from typing import Any, Callable, Type, get_args, get_origin
 
-from pydantic import BaseModel, create_model
+from pydantic import BaseModel, ValidationError, conint, create_model, root_validator
+from pydantic.fields import SHAPE_LIST, ModelField
 
 
 @lru_cache(maxsize=None)
@@ -11,3 +12,81 @@ def make_update_schema(input_schema: Type[BaseModel]) -> Type[BaseModel]:
     validators = {"__validators__": input_schema.__validators__}
     optional_fields = {key: (item.type_ | None, None) for key, item in fields.items()}
     return create_model(input_schema.__name__.replace("Input", "Update"), **optional_fields, __validators__=validators)
+
+
+def _check_not_empty(cls, values: dict) -> dict:
+    assert any(value is not None for key, value in values.items() if key != "id"), "Nothing to update"
+    return values
+
+
+@lru_cache(maxsize=None)
+def make_bulk_update_schema(update_schema: Type[BaseModel]) -> Type[BaseModel]:
+    """Update schema of an item of bulk update: the same optional fields and id of the entity to update"""
+    validators = {"check_not_empty": root_validator(allow_reuse=True)(_check_not_empty)}
+    return create_model(
+        update_schema.__name__.replace("Update", "BulkUpdate"),
+        id=(conint(gt=0), ...),
+        __base__=update_schema,
+        __validators__=validators,
+    )
+
+
+def validate_bulk_items(schema: Type[BaseModel], items: list[Any]) -> tuple[list[int], list[BaseModel], dict[int, Any]]:
+    """Indexes of valid items, the items parsed by `schema` and validation errors of others by their index"""
+    indexes, valid_items, errors = [], [], {}
+    for index, item in enumerate(items):
+        try:
+            valid_items.append(schema.parse_obj(item))
+        except ValidationError as error:
+            errors[index] = error.errors()
+        else:
+            indexes.append(index)
+    return indexes, valid_items, errors
+
+
+def make_bulk_output(indexes: list[int], result: Any, errors: dict[int, Any]) -> dict:
+    """
+    Output of bulk operation `result` run for items at `indexes` of the request,
+    its errors are reported by index in the request together with validation `errors`
+    """
+    errors = errors | {indexes[error.index]: error.detail for error in result.errors}
+    return {"items": result.items, "errors": [{"index": index, "detail": errors[index]} for index in sorted(errors)]}
+
+
+projector_typing = Callable[[Any], Any]
+
+
+def _project_list(project_item: projector_typing) -> projector_typing:
+    return lambda values: [project_item(value) for value in values]
+
+
+def _make_field_projector(field: ModelField) -> projector_typing | None:
+    if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+        project_item = make_schema_projector(field.type_)
+        return _project_list(project_item) if field.shape == SHAPE_LIST else project_item
+    return None
+
+
+@lru_cache(maxsize=None)
+def make_schema_projector(output_schema: Any) -> projector_typing:
+    """
+    Builds function taking fields of `output_schema` from trusted objects or dicts into plain dicts,
+    the same shape response_model validation gives, but without validating values again
+    """
+    if get_origin(output_schema) is list:
+        return _project_list(make_schema_projector(get_args(output_schema)[0]))
+    if not (isinstance(output_schema, type) and issubclass(output_schema, BaseModel)):
+        return lambda value: value
+    field_projectors = tuple(
+        (name, _make_field_projector(field)) for name, field in output_schema.__fields__.items()
+    )
+
+    def project(obj: Any) -> dict | None:
+        if obj is None:
+            return None
+        get = obj.get if isinstance(obj, dict) else partial(getattr, obj)
+        return {
+            name: project_field(get(name)) if project_field else get(name) for name, project_field in field_projectors
+        }
+
+    return project
@@ -6,21 +6,34 @@ from config.settings import get_settings, Settings
 def build_app(settings: Settings):
     from fastapi import FastAPI
 
+    from controller.middlewares import ResponseCacheMiddleware, ServerTimingMiddleware
     from controller.routers import api_routers
     from config.exception_handlers import exception_handlers
 
+    from model.services.cache import LRUCache
     from model.storage.connection import connect_on_startup, disconnect_on_shutdown
 
     app = FastAPI(docs_url="/", servers=[{"url": settings.app.ADDRESS, "description": "Local server"}])
+    app.state.auth_cache = LRUCache(settings.app.AUTH_CACHE_SIZE, settings.app.AUTH_CACHE_TTL)
 
     for exc, handler in exception_handlers:
         app.add_exception_handler(exc, handler)
     for router in api_routers:
         app.include_router(router)
+    if settings.app.RESPONSE_CACHE:
+        app.add_middleware(
+            ResponseCacheMiddleware,
+            routes={"/companies": ("companies",), "/trips": ("trips", "companies")},
+            maxsize=settings.app.RESPONSE_CACHE_SIZE,
+            ttl=settings.app.RESPONSE_CACHE_TTL,
+        )
+    if settings.app.SERVER_TIMING:
+        # added last to be the outermost one, so responses from the cache are timed too
+        app.add_middleware(ServerTimingMiddleware)
 
     @app.on_event("startup")
     async def init_database_session():
-        await connect_on_startup(app, settings.database)
+        await connect_on_startup(app, settings.database, settings.app.SERVER_TIMING)
 
     @app.on_event("shutdown")
     async def close_database_session():
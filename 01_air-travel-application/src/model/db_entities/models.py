@@ -10,6 +10,9 @@ class BaseDBModel(BaseModel, orm_mode=True):
 
     class Meta:
         table = None
+        indexes = ()
+        sorted_indexes = ()
+        interned = ()
 
 
 class CompanyModel(BaseDBModel):
@@ -29,6 +32,9 @@ class TripModel(BaseDBModel):
 
     class Meta:
         table = "trips"
+        indexes = ("company",)
+        sorted_indexes = ("time_out", "time_in")
+        interned = ("town_from", "town_to")
 
 
 class PassInTripModel(BaseDBModel):
@@ -38,11 +44,13 @@ class PassInTripModel(BaseDBModel):
 
     class Meta:
         table = "pass_in_trip"
+        indexes = ("trip", "passenger")
+        interned = ("place",)
 
 
 class UserModel(BaseDBModel):
     name: str
-    role: UserRoleEnum
+    role: UserRoleEnum = UserRoleEnum.PASSENGER
 
     class Meta:
         table = "users"
@@ -0,0 +1,115 @@
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from time import monotonic, perf_counter
+from typing import Any, Awaitable, Callable, Collection, Hashable, Mapping
+
+from starlette.requests import Request
+
+_missing = object()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    lookup_time_total: float = 0.0
+    lookup_time_max: float = 0.0
+
+    def record_lookup(self, lookup_time: float):
+        self.lookup_time_total += lookup_time
+        self.lookup_time_max = max(self.lookup_time_max, lookup_time)
+
+    def as_dict(self) -> dict:
+        result = asdict(self)
+        lookups = self.hits + self.misses
+        result["hit_rate"] = self.hits / lookups if lookups else 0.0
+        result["lookup_time_avg"] = self.lookup_time_total / lookups if lookups else 0.0
+        return result
+
+
+class LRUCache:
+    """Keeps up to `maxsize` recently used values for `ttl` seconds, zero `maxsize` disables caching"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._values: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        # changes on every invalidation, so a value loaded before it is not put back into the cache
+        self._generation = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if (item := self._values.get(key)) is None:
+            self.stats.misses += 1
+            return default
+        expires_at, value = item
+        if expires_at < monotonic():
+            del self._values[key]
+            self.stats.misses += 1
+            return default
+        self._values.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        if not self.maxsize:
+            return
+        self._values[key] = monotonic() + self.ttl, value
+        self._values.move_to_end(key)
+        while len(self._values) > self.maxsize:
+            self._values.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._generation += 1
+        self.stats.invalidations += 1
+        self._values.pop(key, None)
+
+    def clear(self):
+        self._generation += 1
+        self._values.clear()
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value or the one loaded by `load`, time of the whole lookup is recorded in stats"""
+        started_at = perf_counter()
+        try:
+            if (value := self.get(key, _missing)) is _missing:
+                generation = self._generation
+                value = await load()
+                if generation == self._generation:
+                    self.set(key, value)
+            return value
+        finally:
+            self.stats.record_lookup(perf_counter() - started_at)
+
+    async def get_or_load_many(
+        self, keys: Collection[Hashable], load: Callable[[list], Awaitable[Mapping[Hashable, Any]]]
+    ) -> list:
+        """
+        Cached values followed by the ones `load` returns by key for the missing keys.
+        Like get_or_load, loaded values are cached only if nothing was invalidated while loading.
+        """
+        started_at = perf_counter()
+        try:
+            result, missing_keys = [], []
+            for key in keys:
+                if (value := self.get(key, _missing)) is _missing:
+                    missing_keys.append(key)
+                else:
+                    result.append(value)
+            if missing_keys:
+                generation = self._generation
+                loaded = await load(missing_keys)
+                if generation == self._generation:
+                    for key, value in loaded.items():
+                        self.set(key, value)
+                result.extend(loaded.values())
+            return result
+        finally:
+            self.stats.record_lookup(perf_counter() - started_at)
+
+
+def get_auth_cache(request: Request) -> LRUCache:
+    return request.app.state.auth_cache
@@ -1,22 +1,77 @@
-from typing import NoReturn
+import inspect
+from typing import Any, AsyncIterator, Collection, Iterable, NamedTuple, NoReturn, Sequence, Type
 
 from fastapi import Depends
 
 from controller.dependencies.filters import filter_map_typing
-from controller.dependencies.pagination import Pagination
+from controller.dependencies.pagination import pagination_typing
+from model.db_entities.models import BaseDBModel
 from model.services.dto import BaseDTO
+from model.services.timing import timed_call
 from model.storage.base import BaseDatabaseHandler
 from model.storage.connection import get_db_connection
+from model.storage.exceptions import EntityNotFoundError
+
+
+class BulkItemError(NamedTuple):
+    """Error of the `index`-th item of a bulk operation"""
+
+    index: int
+    detail: Any
+
+
+class BulkResult(NamedTuple):
+    """Results of items of a bulk operation which succeeded, in order of the items, and errors of others"""
+
+    items: list
+    errors: list[BulkItemError]
+
+
+def find_missing_references(
+    data: Sequence[dict], field: str, model: Type[BaseDBModel], found_ids: Collection[int]
+) -> dict[int, str]:
+    """Errors by position of items which reference by `field` an entity of `model` missing in `found_ids`"""
+    return {
+        position: EntityNotFoundError(model.Meta.table, item[field]).description
+        for position, item in enumerate(data)
+        if item.get(field) is not None and item[field] not in found_ids
+    }
+
+
+def find_missing_ids(ids: Sequence[int], model: Type[BaseDBModel], found_ids: Collection[int]) -> dict[int, str]:
+    return {
+        position: EntityNotFoundError(model.Meta.table, _id).description
+        for position, _id in enumerate(ids)
+        if _id not in found_ids
+    }
+
+
+def make_bulk_result(items: list, errors: dict[int, Any]) -> BulkResult:
+    return BulkResult(items, [BulkItemError(position, detail) for position, detail in sorted(errors.items())])
 
 
 class CRUDInterface:
     def __init__(self, db_conn: BaseDatabaseHandler = Depends(get_db_connection)):
         self.db_conn = db_conn
 
+    def __init_subclass__(cls, **kwargs):
+        """Public coroutine methods of implementations add their time to the "crud" phase of timed requests"""
+        super().__init_subclass__(**kwargs)
+        for name, method in list(vars(cls).items()):
+            if not name.startswith("_") and inspect.iscoroutinefunction(method):
+                setattr(cls, name, timed_call("crud")(method))
+
     async def create(self, data: dict) -> BaseDTO:
         raise NotImplementedError
 
-    async def read(self, filter_map: filter_map_typing, pagination: Pagination) -> list[BaseDTO]:
+    async def read(self, filter_map: filter_map_typing, pagination: pagination_typing) -> list[BaseDTO]:
+        raise NotImplementedError
+
+    async def count(self, filter_map: filter_map_typing) -> int:
+        raise NotImplementedError
+
+    def read_batches(self, filter_map: filter_map_typing, batch_size: int = 1000) -> AsyncIterator[list[BaseDTO]]:
+        """All entities matching `filter_map` ordered by id, in batches of `batch_size`"""
         raise NotImplementedError
 
     async def read_by_id(self, _id: int) -> BaseDTO:
@@ -27,3 +82,21 @@ class CRUDInterface:
 
     async def delete_by_id(self, _id: int) -> NoReturn:
         raise NotImplementedError
+
+    async def create_many(self, data: list[dict]) -> BulkResult:
+        raise NotImplementedError
+
+    async def update_many(self, data: list[tuple[int, dict]]) -> BulkResult:
+        raise NotImplementedError
+
+    async def delete_many(self, ids: list[int]) -> BulkResult:
+        raise NotImplementedError
+
+    async def _select_related(self, model: Type[BaseDBModel], ids: Iterable[int | None]) -> dict[int, BaseDBModel]:
+        return {row.id: row for row in await self.db_conn.select_by_ids(model, set(ids) - {None})}
+
+    async def _delete_many(self, model: Type[BaseDBModel], ids: list[int]) -> BulkResult:
+        deleted_ids = set(await self.db_conn.delete_many(model, ids))
+        return make_bulk_result(
+            [_id for _id in dict.fromkeys(ids) if _id in deleted_ids], find_missing_ids(ids, model, deleted_ids)
+        )
@@ -1,9 +1,9 @@
 from typing import NoReturn
 
 from controller.dependencies.filters import filter_map_typing
-from controller.dependencies.pagination import Pagination
+from controller.dependencies.pagination import pagination_typing
 from model.db_entities.models import CompanyModel
-from model.services.crud.base import CRUDInterface
+from model.services.crud.base import BulkResult, CRUDInterface, find_missing_ids, make_bulk_result
 from model.services.dto import CompanyDTO
 
 
@@ -11,11 +11,14 @@ class CompanyCRUD(CRUDInterface):
     async def create(self, data: dict) -> CompanyDTO:
         return CompanyDTO.from_database(await self.db_conn.insert(CompanyModel, data))
 
-    async def read(self, filter_map: filter_map_typing, pagination: Pagination) -> list[CompanyDTO]:
+    async def read(self, filter_map: filter_map_typing, pagination: pagination_typing) -> list[CompanyDTO]:
         return [
             CompanyDTO.from_database(row) for row in await self.db_conn.select(CompanyModel, filter_map, pagination)
         ]
 
+    async def count(self, filter_map: filter_map_typing) -> int:
+        return await self.db_conn.count(CompanyModel, filter_map)
+
     async def read_by_id(self, _id: int) -> CompanyDTO:
         return CompanyDTO.from_database(await self.db_conn.select_by_id(CompanyModel, _id))
 
@@ -24,3 +27,18 @@ class CompanyCRUD(CRUDInterface):
 
     async def delete_by_id(self, _id: int) -> NoReturn:
         await self.db_conn.delete_by_id(CompanyModel, _id)
+
+    async def create_many(self, data: list[dict]) -> BulkResult:
+        companies = await self.db_conn.insert_many(CompanyModel, data)
+        return BulkResult([CompanyDTO.from_database(company) for company in companies], [])
+
+    async def update_many(self, data: list[tuple[int, dict]]) -> BulkResult:
+        companies = {company.id: company for company in await self.db_conn.update_many(CompanyModel, data)}
+        ids = [_id for _id, _ in data]
+        return make_bulk_result(
+            [CompanyDTO.from_database(companies[_id]) for _id in ids if _id in companies],
+            find_missing_ids(ids, CompanyModel, companies),
+        )
+
+    async def delete_many(self, ids: list[int]) -> BulkResult:
+        return await self._delete_many(CompanyModel, ids)
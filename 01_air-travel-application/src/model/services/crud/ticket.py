@@ -1,13 +1,27 @@
-from typing import NoReturn
+from typing import AsyncIterator, Iterable, NoReturn
 
 from controller.dependencies.filters import filter_map_typing
-from controller.dependencies.pagination import Pagination, one_elem
+from controller.dependencies.pagination import one_elem, pagination_typing
 from model.db_entities.models import CompanyModel, TripModel, PassInTripModel, UserModel
-from model.services.crud.base import CRUDInterface
+from model.services.crud.base import (
+    BulkResult,
+    CRUDInterface,
+    find_missing_ids,
+    find_missing_references,
+    make_bulk_result,
+)
 from model.services.dto import TicketDTO
+from model.storage.base import Relation
+from model.storage.exceptions import EntityNotFoundError
 
 
 class TicketCRUD(CRUDInterface):
+    _relations = (
+        Relation(TripModel, "trip"),
+        Relation(CompanyModel, "company", source=1),
+        Relation(UserModel, "passenger"),
+    )
+
     async def _get_company(self, company_id: int) -> CompanyModel:
         return await self.db_conn.select_by_id(CompanyModel, company_id)
 
@@ -24,27 +38,25 @@ class TicketCRUD(CRUDInterface):
         inserted_ticket = await self.db_conn.insert(PassInTripModel, data)
         return TicketDTO.from_database(inserted_ticket, trip, company, user)
 
-    async def read(self, filter_map: filter_map_typing, pagination: Pagination = one_elem) -> list[TicketDTO]:
-        result = []
-        for ticket in await self.db_conn.select(PassInTripModel, filter_map, pagination):
-            result.append(
-                TicketDTO.from_database(
-                    ticket,
-                    trip := await self._get_trip(ticket.trip),
-                    await self._get_company(trip.company),
-                    await self._get_user(ticket.passenger),
-                )
-            )
-        return result
+    async def read(self, filter_map: filter_map_typing, pagination: pagination_typing = one_elem) -> list[TicketDTO]:
+        return [
+            TicketDTO.from_database(*row)
+            for row in await self.db_conn.select_joined(PassInTripModel, self._relations, filter_map, pagination)
+        ]
+
+    async def read_batches(
+        self, filter_map: filter_map_typing, batch_size: int = 1000
+    ) -> AsyncIterator[list[TicketDTO]]:
+        async for rows in self.db_conn.iter_select_joined(PassInTripModel, self._relations, filter_map, batch_size):
+            yield [TicketDTO.from_database(*row) for row in rows]
+
+    async def count(self, filter_map: filter_map_typing) -> int:
+        return await self.db_conn.count(PassInTripModel, filter_map)
 
     async def read_by_id(self, _id: int) -> TicketDTO:
-        ticket = await self.db_conn.select_by_id(PassInTripModel, _id)
-        return TicketDTO.from_database(
-            ticket,
-            trip := await self._get_trip(ticket.trip),
-            await self._get_company(trip.company),
-            await self._get_user(ticket.passenger),
-        )
+        if result := await self.read({"eq_": [("id", _id)]}, one_elem):
+            return result[0]
+        raise EntityNotFoundError(PassInTripModel.Meta.table, _id)
 
     async def update_by_id(self, _id: int, data: dict) -> TicketDTO:
         trip = await self._get_trip(data["trip"]) if data.get("trip") else None
@@ -59,3 +71,46 @@ class TicketCRUD(CRUDInterface):
 
     async def delete_by_id(self, _id: int) -> NoReturn:
         await self.db_conn.delete_by_id(PassInTripModel, _id)
+
+    async def _make_dtos(
+        self, tickets: Iterable[PassInTripModel], trips: dict[int, TripModel], users: dict[int, UserModel]
+    ) -> dict[int, TicketDTO]:
+        """DTOs of tickets by id, related entities missing in given dicts are selected in one batch per table"""
+        tickets = list(tickets)
+        trips = trips | await self._select_related(TripModel, {ticket.trip for ticket in tickets} - trips.keys())
+        users = users | await self._select_related(UserModel, {ticket.passenger for ticket in tickets} - users.keys())
+        companies = await self._select_related(CompanyModel, {trips[ticket.trip].company for ticket in tickets})
+        return {
+            ticket.id: TicketDTO.from_database(
+                ticket, trips[ticket.trip], companies[trips[ticket.trip].company], users[ticket.passenger]
+            )
+            for ticket in tickets
+        }
+
+    async def _find_missing_references(self, values: list[dict]) -> tuple[dict, dict, dict[int, str]]:
+        trips = await self._select_related(TripModel, (value.get("trip") for value in values))
+        users = await self._select_related(UserModel, (value.get("passenger") for value in values))
+        errors = {
+            **find_missing_references(values, "passenger", UserModel, users),
+            **find_missing_references(values, "trip", TripModel, trips),
+        }
+        return trips, users, errors
+
+    async def create_many(self, data: list[dict]) -> BulkResult:
+        trips, users, errors = await self._find_missing_references(data)
+        tickets = await self.db_conn.insert_many(
+            PassInTripModel, [item for position, item in enumerate(data) if position not in errors]
+        )
+        return make_bulk_result(list((await self._make_dtos(tickets, trips, users)).values()), errors)
+
+    async def update_many(self, data: list[tuple[int, dict]]) -> BulkResult:
+        trips, users, errors = await self._find_missing_references([value for _, value in data])
+        tickets = await self.db_conn.update_many(
+            PassInTripModel, [pair for position, pair in enumerate(data) if position not in errors]
+        )
+        dtos = await self._make_dtos(tickets, trips, users)
+        errors = {**find_missing_ids([_id for _id, _ in data], PassInTripModel, dtos), **errors}
+        return make_bulk_result([dtos[_id] for position, (_id, _) in enumerate(data) if position not in errors], errors)
+
+    async def delete_many(self, ids: list[int]) -> BulkResult:
+        return await self._delete_many(PassInTripModel, ids)
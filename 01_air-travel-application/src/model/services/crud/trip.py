@@ -1,13 +1,22 @@
-from typing import NoReturn
+from typing import AsyncIterator, Iterable, NoReturn
 
 from controller.dependencies.filters import filter_map_typing
-from controller.dependencies.pagination import Pagination
+from controller.dependencies.pagination import pagination_typing
 from model.db_entities.models import CompanyModel, TripModel
-from model.services.crud.base import CRUDInterface
+from model.services.crud.base import (
+    BulkResult,
+    CRUDInterface,
+    find_missing_ids,
+    find_missing_references,
+    make_bulk_result,
+)
 from model.services.dto import TripDTO
+from model.storage.base import Relation
 
 
 class TripCRUD(CRUDInterface):
+    _relations = (Relation(CompanyModel, "company"),)
+
     async def _get_company(self, company_id: int) -> CompanyModel:
         return await self.db_conn.select_by_id(CompanyModel, company_id)
 
@@ -16,11 +25,18 @@ class TripCRUD(CRUDInterface):
         inserted_trip = await self.db_conn.insert(TripModel, data)
         return TripDTO.from_database(inserted_trip, company)
 
-    async def read(self, filter_map: filter_map_typing, pagination: Pagination) -> list[TripDTO]:
-        result = []
-        for trip in await self.db_conn.select(TripModel, filter_map, pagination):
-            result.append(TripDTO.from_database(trip, await self._get_company(trip.company)))
-        return result
+    async def read(self, filter_map: filter_map_typing, pagination: pagination_typing) -> list[TripDTO]:
+        return [
+            TripDTO.from_database(*row)
+            for row in await self.db_conn.select_joined(TripModel, self._relations, filter_map, pagination)
+        ]
+
+    async def count(self, filter_map: filter_map_typing) -> int:
+        return await self.db_conn.count(TripModel, filter_map)
+
+    async def read_batches(self, filter_map: filter_map_typing, batch_size: int = 1000) -> AsyncIterator[list[TripDTO]]:
+        async for rows in self.db_conn.iter_select_joined(TripModel, self._relations, filter_map, batch_size):
+            yield [TripDTO.from_database(*row) for row in rows]
 
     async def read_by_id(self, _id: int) -> TripDTO:
         trip = await self.db_conn.select_by_id(TripModel, _id)
@@ -33,3 +49,33 @@ class TripCRUD(CRUDInterface):
 
     async def delete_by_id(self, _id: int) -> NoReturn:
         await self.db_conn.delete_by_id(TripModel, _id)
+
+    async def _make_dtos(self, trips: Iterable[TripModel], companies: dict[int, CompanyModel]) -> dict[int, TripDTO]:
+        """DTOs of trips by id, companies missing in `companies` are selected in one batch"""
+        trips = list(trips)
+        companies = companies | await self._select_related(
+            CompanyModel, {trip.company for trip in trips} - companies.keys()
+        )
+        return {trip.id: TripDTO.from_database(trip, companies[trip.company]) for trip in trips}
+
+    async def create_many(self, data: list[dict]) -> BulkResult:
+        companies = await self._select_related(CompanyModel, (item["company"] for item in data))
+        errors = find_missing_references(data, "company", CompanyModel, companies)
+        trips = await self.db_conn.insert_many(
+            TripModel, [item for position, item in enumerate(data) if position not in errors]
+        )
+        return make_bulk_result(list((await self._make_dtos(trips, companies)).values()), errors)
+
+    async def update_many(self, data: list[tuple[int, dict]]) -> BulkResult:
+        values = [value for _, value in data]
+        companies = await self._select_related(CompanyModel, (value.get("company") for value in values))
+        errors = find_missing_references(values, "company", CompanyModel, companies)
+        trips = await self.db_conn.update_many(
+            TripModel, [pair for position, pair in enumerate(data) if position not in errors]
+        )
+        dtos = await self._make_dtos(trips, companies)
+        errors = {**find_missing_ids([_id for _id, _ in data], TripModel, dtos), **errors}
+        return make_bulk_result([dtos[_id] for position, (_id, _) in enumerate(data) if position not in errors], errors)
+
+    async def delete_many(self, ids: list[int]) -> BulkResult:
+        return await self._delete_many(TripModel, ids)
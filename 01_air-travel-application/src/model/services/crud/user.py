@@ -1,24 +1,47 @@
 from typing import NoReturn
 
+from fastapi import Depends
+
 from controller.dependencies.filters import filter_map_typing
-from controller.dependencies.pagination import Pagination
+from controller.dependencies.pagination import pagination_typing
 from model.db_entities.models import UserModel
+from model.services.cache import LRUCache, get_auth_cache
 from model.services.crud.base import CRUDInterface
 from model.services.dto import UserDTO
+from model.storage.base import BaseDatabaseHandler
+from model.storage.connection import get_db_connection
 
 
 class UserCRUD(CRUDInterface):
+    def __init__(
+        self,
+        db_conn: BaseDatabaseHandler = Depends(get_db_connection),
+        auth_cache: LRUCache = Depends(get_auth_cache),
+    ):
+        super().__init__(db_conn)
+        self.auth_cache = auth_cache
+
     async def create(self, data: dict) -> UserDTO:
         return UserDTO.from_database(await self.db_conn.insert(UserModel, data))
 
-    async def read(self, filter_map: filter_map_typing, pagination: Pagination) -> list[UserDTO]:
+    async def read(self, filter_map: filter_map_typing, pagination: pagination_typing) -> list[UserDTO]:
         return [UserDTO.from_database(row) for row in await self.db_conn.select(UserModel, filter_map, pagination)]
 
+    async def count(self, filter_map: filter_map_typing) -> int:
+        return await self.db_conn.count(UserModel, filter_map)
+
     async def read_by_id(self, _id: int) -> UserDTO:
         return UserDTO.from_database(await self.db_conn.select_by_id(UserModel, _id))
 
     async def update_by_id(self, _id: int, data: dict) -> UserDTO:
-        return UserDTO.from_database(await self.db_conn.update_by_id(UserModel, _id, data))
+        try:
+            return UserDTO.from_database(await self.db_conn.update_by_id(UserModel, _id, data))
+        finally:
+            # after the write, so a role read while it was running is not left in the cache
+            self.auth_cache.invalidate(_id)
 
     async def delete_by_id(self, _id: int) -> NoReturn:
-        await self.db_conn.delete_by_id(UserModel, _id)
+        try:
+            await self.db_conn.delete_by_id(UserModel, _id)
+        finally:
+            self.auth_cache.invalidate(_id)
@@ -4,6 +4,8 @@ from model.db_entities.models import CompanyModel, TripModel, UserModel, PassInT
 
 
 class BaseDTO(BaseModel, orm_mode=True, extra=Extra.allow):
+    """DTOs are built from rows given by the storage, which are valid already, so they are not validated again"""
+
     @classmethod
     def from_database(cls, *args, **kwargs) -> "BaseDTO":
         raise NotImplementedError
@@ -12,7 +14,7 @@ class BaseDTO(BaseModel, orm_mode=True, extra=Extra.allow):
 class CompanyDTO(BaseDTO):
     @classmethod
     def from_database(cls, company: CompanyModel) -> "CompanyDTO":
-        return cls.parse_obj(company)
+        return cls.construct(**company.__dict__)
 
 
 class TripDTO(BaseDTO):
@@ -20,15 +22,13 @@ class TripDTO(BaseDTO):
 
     @classmethod
     def from_database(cls, trip: TripModel, company: CompanyModel) -> "TripDTO":
-        dto = cls.parse_obj(trip)
-        dto.company = company
-        return dto
+        return cls.construct(**{**trip.__dict__, "company": company})
 
 
 class UserDTO(BaseDTO):
     @classmethod
     def from_database(cls, user: UserModel) -> "UserDTO":
-        return cls.parse_obj(user)
+        return cls.construct(**user.__dict__)
 
 
 class TicketDTO(BaseDTO):
@@ -39,9 +39,7 @@ class TicketDTO(BaseDTO):
     def from_database(
         cls, ticket: PassInTripModel, trip: TripModel, company: CompanyModel, user: UserModel | None = None
     ) -> "TicketDTO":
-        trip_dto = TripDTO.from_database(trip, company)
-        dto = cls.parse_obj(ticket)
-        dto.trip = trip_dto
+        values = {**ticket.__dict__, "trip": TripDTO.from_database(trip, company)}
         if user:
-            dto.passenger = UserDTO.from_database(user)
-        return dto
+            values["passenger"] = UserDTO.from_database(user)
+        return cls.construct(**values)
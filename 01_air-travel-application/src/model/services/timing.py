@@ -0,0 +1,85 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import Awaitable, Callable, ContextManager, Iterator, TypeVar
+
+ResultVar = TypeVar("ResultVar")
+
+_disabled = nullcontext()
+
+
+class RequestTimings:
+    """
+    Durations and counts of phases of one request. Durations are exclusive: time of a phase nested in another one
+    is counted only for the nested phase, so durations of all phases add up to the time spent in them.
+    """
+
+    def __init__(self):
+        self.durations: defaultdict[str, float] = defaultdict(float)
+        self.counts: Counter[str] = Counter()
+        # time of phases finished inside the running one
+        self._nested = 0.0
+
+    def as_dict(self) -> dict[str, dict]:
+        return {
+            phase: {"ms": round(duration * 1000, 3), "count": self.counts[phase]}
+            for phase, duration in self.durations.items()
+        }
+
+
+_request_timings: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+class _Span:
+    __slots__ = ("timings", "phase", "started_at", "outer_nested")
+
+    def __init__(self, timings: RequestTimings, phase: str):
+        self.timings = timings
+        self.phase = phase
+
+    def __enter__(self):
+        self.outer_nested, self.timings._nested = self.timings._nested, 0.0
+        self.started_at = perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = perf_counter() - self.started_at
+        timings = self.timings
+        timings.durations[self.phase] += elapsed - timings._nested
+        timings.counts[self.phase] += 1
+        timings._nested = self.outer_nested + elapsed
+
+
+@contextmanager
+def collect_request_timings() -> Iterator[RequestTimings]:
+    """Timings of phases run inside the block, including tasks and threads started from it"""
+    timings = RequestTimings()
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def timed(phase: str) -> ContextManager:
+    """Adds the time of the block to `phase` of the current request, does nothing outside of timed requests"""
+    if (timings := _request_timings.get()) is None:
+        return _disabled
+    return _Span(timings, phase)
+
+
+def timed_call(phase: str) -> Callable[[Callable[..., Awaitable[ResultVar]]], Callable[..., Awaitable[ResultVar]]]:
+    """Decorator of coroutine functions, which adds time of their calls to `phase` of the current request"""
+
+    def decorator(func: Callable[..., Awaitable[ResultVar]]) -> Callable[..., Awaitable[ResultVar]]:
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> ResultVar:
+            if (timings := _request_timings.get()) is None:
+                return await func(*args, **kwargs)
+            with _Span(timings, phase):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
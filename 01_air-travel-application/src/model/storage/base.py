@@ -1,27 +1,115 @@
-from typing import Type, TypeVar
+import logging
+from collections import Counter
+from typing import AsyncIterator, Collection, NamedTuple, Sequence, Type, TypeVar
 
 from controller.dependencies.filters import filter_map_typing
-from controller.dependencies.pagination import Pagination
+from controller.dependencies.pagination import KeysetPagination, pagination_typing
 from model.db_entities.models import BaseDBModel
+from model.storage.exceptions import EntityNotFoundError
+
+logger = logging.getLogger(__name__)
 
 ModelVar = TypeVar("ModelVar", bound=BaseDBModel)
 
 
+class Relation(NamedTuple):
+    """Foreign key `field` of the `source`-th model of a joined row, which references `model`"""
+
+    model: Type[BaseDBModel]
+    field: str
+    source: int = 0
+
+
+def log_skipped_rows(count: int, table: str, missing_ids: Collection[int]):
+    logger.warning(
+        "Skipped %d rows referencing missing entities of %s, the smallest missing id is %s",
+        count,
+        table,
+        min(missing_ids),
+    )
+
+
 class BaseDatabaseHandler:
+    def __init__(self):
+        # changes of each table made through the handler, so the data derived from a table can tell it's stale
+        self.table_versions: Counter[str] = Counter()
+
     async def connect(self, settings):
         ...
 
     async def disconnect(self, settings):
         ...
 
+    def metrics(self) -> dict:
+        return {}
+
     async def select(
-        self, model: Type[ModelVar], filter_map: filter_map_typing, pagination: Pagination
+        self, model: Type[ModelVar], filter_map: filter_map_typing, pagination: pagination_typing
     ) -> list[ModelVar]:
         ...
 
+    async def count(self, model: Type[BaseDBModel], filter_map: filter_map_typing) -> int:
+        ...
+
     async def select_by_id(self, model: Type[ModelVar], _id: int) -> ModelVar:
         ...
 
+    async def select_by_ids(self, model: Type[ModelVar], ids: Collection[int]) -> list[ModelVar]:
+        """Batched select_by_id: missing ids are skipped, order of result is not guaranteed"""
+        ...
+
+    async def select_joined(
+        self,
+        model: Type[BaseDBModel],
+        relations: Sequence[Relation],
+        filter_map: filter_map_typing,
+        pagination: pagination_typing,
+    ) -> list[tuple[BaseDBModel, ...]]:
+        """
+        Selects rows of `model` together with the entities they reference:
+        each result is a tuple of (row, *related rows) in order of `relations`.
+        Generic implementation makes one select_by_ids call per relation.
+        """
+        return await self._join_related(await self.select(model, filter_map, pagination), relations)
+
+    async def _join_related(
+        self, rows: Sequence[BaseDBModel], relations: Sequence[Relation], skip_dangling: bool = False
+    ) -> list[tuple[BaseDBModel, ...]]:
+        """A row referencing a missing entity raises EntityNotFoundError or is logged and skipped with skip_dangling"""
+        rows = [(row,) for row in rows]
+        for relation in relations:
+            foreign_keys = {getattr(row[relation.source], relation.field) for row in rows}
+            related = {entity.id: entity for entity in await self.select_by_ids(relation.model, foreign_keys)}
+            if missing_ids := foreign_keys - related.keys():
+                if not skip_dangling:
+                    raise EntityNotFoundError(relation.model.Meta.table, min(missing_ids))
+                kept_rows = [row for row in rows if getattr(row[relation.source], relation.field) in related]
+                log_skipped_rows(len(rows) - len(kept_rows), relation.model.Meta.table, missing_ids)
+                rows = kept_rows
+            rows = [(*row, related[getattr(row[relation.source], relation.field)]) for row in rows]
+        return rows
+
+    async def iter_select_joined(
+        self,
+        model: Type[BaseDBModel],
+        relations: Sequence[Relation],
+        filter_map: filter_map_typing,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[tuple[BaseDBModel, ...]]]:
+        """
+        Batches of select_joined rows over all rows of `model` matching `filter_map`, ordered by id.
+        Rows referencing a missing entity are skipped and logged: batches are streamed, and once the stream
+        has started an error can't be reported to the client anymore.
+        Generic implementation selects each batch as a keyset page after the last id of the previous one.
+        """
+        pagination = KeysetPagination(limit=batch_size)
+        while rows := await self.select(model, filter_map, pagination):
+            if joined_rows := await self._join_related(rows, relations, skip_dangling=True):
+                yield joined_rows
+            if len(rows) < batch_size:
+                return
+            pagination = pagination._replace(after=(rows[-1].id,))
+
     async def insert(self, model: Type[ModelVar], value: dict) -> ModelVar:
         ...
 
@@ -30,3 +118,28 @@ class BaseDatabaseHandler:
 
     async def delete_by_id(self, model: Type[ModelVar], _id: int) -> bool:
         ...
+
+    async def insert_many(self, model: Type[ModelVar], values: Sequence[dict]) -> list[ModelVar]:
+        """Inserts rows as one batch, result is in order of `values`. Generic implementation inserts them one by one"""
+        return [await self.insert(model, value) for value in values]
+
+    async def update_many(self, model: Type[ModelVar], values: Sequence[tuple[int, dict]]) -> list[ModelVar]:
+        """Updates rows by (id, value) pairs as one batch, missing ids are skipped"""
+        result = []
+        for _id, value in values:
+            try:
+                result.append(await self.update_by_id(model, _id, value))
+            except EntityNotFoundError:
+                continue
+        return result
+
+    async def delete_many(self, model: Type[ModelVar], ids: Collection[int]) -> list[int]:
+        """Deletes rows by id as one batch, returns ids of deleted rows"""
+        result = []
+        for _id in dict.fromkeys(ids):
+            try:
+                await self.delete_by_id(model, _id)
+            except EntityNotFoundError:
+                continue
+            result.append(_id)
+        return result
@@ -0,0 +1,121 @@
+from typing import AsyncIterator, Collection, Sequence, Type
+
+from controller.dependencies.filters import filter_map_typing
+from controller.dependencies.pagination import pagination_typing
+from model.db_entities.models import BaseDBModel
+from model.services.cache import LRUCache
+from model.storage.base import BaseDatabaseHandler, ModelVar, Relation
+
+
+# tables with foreign keys to a table, their rows may be deleted with it by ON DELETE CASCADE of SQLite
+DEPENDENT_TABLES = {"companies": ("trips",), "trips": ("pass_in_trip",), "users": ("pass_in_trip",)}
+
+
+class CachedDatabaseHandler(BaseDatabaseHandler):
+    """
+    Read-through cache of entities selected by id in front of any handler, one LRU cache per table listed in `sizes`.
+    Writes through the wrapper invalidate cached entities, other tables and statements go to the handler as is.
+    Deletes clear caches of dependent tables, as cascaded rows are unknown. Writes of other workers
+    or processes are not seen, so entities are kept for `ttl` seconds at most.
+    """
+
+    def __init__(self, handler: BaseDatabaseHandler, sizes: dict[str, int], ttl: float = 60.0):
+        super().__init__()
+        self.handler = handler
+        self.table_versions = handler.table_versions
+        self.caches = {table: LRUCache(size, ttl) for table, size in sizes.items()}
+
+    async def connect(self, settings):
+        await self.handler.connect(settings)
+
+    async def disconnect(self, settings):
+        await self.handler.disconnect(settings)
+
+    def metrics(self) -> dict:
+        entity_cache = {table: cache.stats.as_dict() for table, cache in self.caches.items()}
+        return {**self.handler.metrics(), "entity_cache": entity_cache}
+
+    def _invalidate(self, model: Type[BaseDBModel], _id: int):
+        if (cache := self.caches.get(model.Meta.table)) is not None:
+            cache.invalidate(_id)
+
+    def _clear_dependents(self, table: str):
+        for dependent_table in DEPENDENT_TABLES.get(table, ()):
+            if (cache := self.caches.get(dependent_table)) is not None:
+                cache.clear()
+            self._clear_dependents(dependent_table)
+
+    async def select(
+        self, model: Type[ModelVar], filter_map: filter_map_typing, pagination: pagination_typing
+    ) -> list[ModelVar]:
+        return await self.handler.select(model, filter_map, pagination)
+
+    async def count(self, model: Type[BaseDBModel], filter_map: filter_map_typing) -> int:
+        return await self.handler.count(model, filter_map)
+
+    async def select_by_id(self, model: Type[ModelVar], _id: int) -> ModelVar:
+        if (cache := self.caches.get(model.Meta.table)) is None:
+            return await self.handler.select_by_id(model, _id)
+        return await cache.get_or_load(_id, lambda: self.handler.select_by_id(model, _id))
+
+    async def select_by_ids(self, model: Type[ModelVar], ids: Collection[int]) -> list[ModelVar]:
+        if (cache := self.caches.get(model.Meta.table)) is None:
+            return await self.handler.select_by_ids(model, ids)
+
+        async def load(missing_ids: list[int]) -> dict[int, ModelVar]:
+            return {entity.id: entity for entity in await self.handler.select_by_ids(model, missing_ids)}
+
+        return await cache.get_or_load_many(ids, load)
+
+    async def select_joined(
+        self,
+        model: Type[BaseDBModel],
+        relations: Sequence[Relation],
+        filter_map: filter_map_typing,
+        pagination: pagination_typing,
+    ) -> list[tuple[BaseDBModel, ...]]:
+        return await self.handler.select_joined(model, relations, filter_map, pagination)
+
+    def iter_select_joined(
+        self,
+        model: Type[BaseDBModel],
+        relations: Sequence[Relation],
+        filter_map: filter_map_typing,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[tuple[BaseDBModel, ...]]]:
+        return self.handler.iter_select_joined(model, relations, filter_map, batch_size)
+
+    async def insert(self, model: Type[ModelVar], value: dict) -> ModelVar:
+        return await self.handler.insert(model, value)
+
+    async def update_by_id(self, model: Type[ModelVar], _id: int, value: dict) -> ModelVar | None:
+        try:
+            return await self.handler.update_by_id(model, _id, value)
+        finally:
+            # after the write, so an entity read while it was running is not left in the cache
+            self._invalidate(model, _id)
+
+    async def delete_by_id(self, model: Type[ModelVar], _id: int) -> bool:
+        try:
+            return await self.handler.delete_by_id(model, _id)
+        finally:
+            self._invalidate(model, _id)
+            self._clear_dependents(model.Meta.table)
+
+    async def insert_many(self, model: Type[ModelVar], values: Sequence[dict]) -> list[ModelVar]:
+        return await self.handler.insert_many(model, values)
+
+    async def update_many(self, model: Type[ModelVar], values: Sequence[tuple[int, dict]]) -> list[ModelVar]:
+        try:
+            return await self.handler.update_many(model, values)
+        finally:
+            for _id, _ in values:
+                self._invalidate(model, _id)
+
+    async def delete_many(self, model: Type[ModelVar], ids: Collection[int]) -> list[int]:
+        try:
+            return await self.handler.delete_many(model, ids)
+        finally:
+            for _id in ids:
+                self._invalidate(model, _id)
+            self._clear_dependents(model.Meta.table)
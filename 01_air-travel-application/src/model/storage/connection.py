@@ -4,8 +4,10 @@ from fastapi import FastAPI
 from starlette.requests import Request
 
 from config.settings import DBTypeEnum, DatabaseSettings
+from model.storage.cached import CachedDatabaseHandler
 from model.storage.pythonic.storage import StorageHandler
 from model.storage.raw_sql.storage import SQLiteDBHandler
+from model.storage.timed import TimedDatabaseHandler
 
 
 class DatabaseConnectorProtocol(Protocol):
@@ -16,7 +18,7 @@ class DatabaseConnectorProtocol(Protocol):
         ...
 
 
-async def connect_on_startup(app: FastAPI, db_settings: DatabaseSettings):
+async def connect_on_startup(app: FastAPI, db_settings: DatabaseSettings, server_timing: bool = False):
     db_connection_cls: Type[DatabaseConnectorProtocol]
     match db_settings.database_type:
         case DBTypeEnum.pythonic_storage:
@@ -26,6 +28,12 @@ async def connect_on_startup(app: FastAPI, db_settings: DatabaseSettings):
         case _:
             raise NotImplementedError
     app.state.db_connection = db_connection_cls()
+    if db_settings.entity_cache:
+        app.state.db_connection = CachedDatabaseHandler(
+            app.state.db_connection, db_settings.entity_cache_sizes, db_settings.entity_cache_ttl
+        )
+    if server_timing:
+        app.state.db_connection = TimedDatabaseHandler(app.state.db_connection)
     await app.state.db_connection.connect(db_settings)
 
 
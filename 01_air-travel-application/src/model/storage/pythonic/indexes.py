@@ -0,0 +1,114 @@
+import operator
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Collection, Iterable, Iterator
+
+_value_of_key = operator.itemgetter(0)
+
+
+class HashIndex:
+    """Maps value of `field` to rows having it, rows of each bucket are kept in id order"""
+
+    def __init__(self, field: str):
+        self.field = field
+        self._buckets: dict[Any, dict[int, Any]] = {}
+
+    def add(self, row: Any):
+        bucket = self._buckets.setdefault(key := getattr(row, self.field), {})
+        if bucket and next(reversed(bucket)) > row.id:
+            bucket[row.id] = row
+            self._buckets[key] = dict(sorted(bucket.items()))
+        else:
+            bucket[row.id] = row
+
+    def add_many(self, rows: Iterable):
+        for row in rows:
+            self.add(row)
+
+    def remove(self, row: Any):
+        bucket = self._buckets[key := getattr(row, self.field)]
+        del bucket[row.id]
+        if not bucket:
+            del self._buckets[key]
+
+    def remove_many(self, rows: Iterable):
+        for row in rows:
+            self.remove(row)
+
+    def lookup(self, value: Any) -> Collection:
+        if bucket := self._buckets.get(value):
+            return bucket.values()
+        return ()
+
+
+class UniqueIndex(HashIndex):
+    """Maps value of a unique `field` to the only row having it"""
+
+    def __init__(self, field: str = "id"):
+        super().__init__(field)
+        self._rows: dict[Any, Any] = {}
+
+    def add(self, row: Any):
+        self._rows[getattr(row, self.field)] = row
+
+    def remove(self, row: Any):
+        del self._rows[getattr(row, self.field)]
+
+    def get(self, value: Any) -> Any | None:
+        return self._rows.get(value)
+
+    def lookup(self, value: Any) -> Collection:
+        if (row := self._rows.get(value)) is not None:
+            return (row,)
+        return ()
+
+
+class SortedIndex:
+    """Keeps (value of `field`, id) pairs sorted to answer range queries with bisect"""
+
+    def __init__(self, field: str):
+        self.field = field
+        self._keys: list[tuple[Any, int]] = []
+        self._rows: dict[int, Any] = {}
+
+    def add(self, row: Any):
+        insort(self._keys, (getattr(row, self.field), row.id))
+        self._rows[row.id] = row
+
+    def add_many(self, rows: Iterable):
+        for row in rows:
+            self._keys.append((getattr(row, self.field), row.id))
+            self._rows[row.id] = row
+        self._keys.sort()
+
+    def remove(self, row: Any):
+        del self._keys[bisect_left(self._keys, (getattr(row, self.field), row.id))]
+        del self._rows[row.id]
+
+    def remove_many(self, rows: Iterable):
+        """Removes rows in one pass over keys instead of shifting keys once per row"""
+        ids = {row.id for row in rows}
+        self._keys = [key for key in self._keys if key[1] not in ids]
+        for _id in ids:
+            del self._rows[_id]
+
+    def bounds(
+        self, lower: Any = None, upper: Any = None, include_lower: bool = True, include_upper: bool = True
+    ) -> tuple[int, int]:
+        """Positions of the first and after the last key within the range, None means unbounded"""
+        start, stop = 0, len(self._keys)
+        if lower is not None:
+            start = (bisect_left if include_lower else bisect_right)(self._keys, lower, key=_value_of_key)
+        if upper is not None:
+            stop = (bisect_right if include_upper else bisect_left)(self._keys, upper, key=_value_of_key)
+        return start, max(start, stop)
+
+    def iter_after(self, after: tuple[Any, int] | None = None) -> Iterator:
+        """Rows in (value, id) order, starting right after `after` pair"""
+        keys, rows = self._keys, self._rows
+        for position in range(bisect_right(keys, after) if after else 0, len(keys)):
+            yield rows[keys[position][1]]
+
+    def rows(self, start: int, stop: int) -> list:
+        """Rows between positions returned by `bounds`, in id order"""
+        return [self._rows[_id] for _id in sorted(_id for _, _id in self._keys[start:stop])]
+
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from time import monotonic
+from typing import Iterator
+
+from pydantic import BaseModel
+
+from model.storage.pythonic.snapshot import read_snapshot_tables, write_snapshot_tables
+
+logger = logging.getLogger(__name__)
+
+PUT, DELETE = "put", "delete"
+# seconds between attempts to append entries after an I/O error
+RETRY_INTERVAL = 1.0
+
+
+def read_log(path: Path) -> Iterator[tuple[str, str, int, dict | None]]:
+    """Yields (operation, table, id, row) entries, lines torn by a crash are skipped"""
+    if not path.exists():
+        return
+    # a torn line may end in the middle of a character
+    with open(path, encoding="utf-8", errors="replace") as file:
+        for line in file:
+            try:
+                yield tuple(json.loads(line))
+            except ValueError:
+                continue
+
+
+def append_lines(path: Path, data: bytes):
+    """
+    Appends lines of `data` durably. A torn last line left by a crash is ended first,
+    otherwise the first appended line would be glued to it and skipped on replay as well.
+    """
+    with open(path, "a+b") as file:
+        if file.seek(0, os.SEEK_END):
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b"\n":
+                data = b"\n" + data
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def apply_log_to_tables(tables: dict[str, list[dict]], path: Path) -> dict[str, list[dict]]:
+    """Replays log over snapshot tables loaded as plain json, which keeps compaction free of validation"""
+    rows_by_id = {table: {row["id"]: row for row in rows} for table, rows in tables.items()}
+    for operation, table, _id, row in read_log(path):
+        if operation == PUT:
+            rows_by_id[table][_id] = row
+        else:
+            rows_by_id[table].pop(_id, None)
+    return {table: [rows[_id] for _id in sorted(rows)] for table, rows in rows_by_id.items()}
+
+
+class WriteBehindLog:
+    """
+    Appends every mutation of pythonic storage to a log file and periodically folds the log into the snapshot.
+    File operations run on a worker thread; the single writer task keeps them ordered.
+    Each entry stores the whole row, so replaying a part of the log twice gives the same state.
+    """
+
+    def __init__(
+        self,
+        snapshot_path: str | Path,
+        log_path: str | Path,
+        compaction_interval: float = 60.0,
+        trusted_snapshot: bool = False,
+    ):
+        self.snapshot_path = Path(snapshot_path)
+        self.trusted_snapshot = trusted_snapshot
+        self.log_path = Path(log_path)
+        self.compacting_log_path = self.log_path.with_suffix(self.log_path.suffix + ".compacting")
+        self.compaction_interval = compaction_interval
+        self._queue: asyncio.Queue[str | None] = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        self._dirty = self.log_path.exists() or self.compacting_log_path.exists()
+
+    @property
+    def log_paths(self) -> tuple[Path, Path]:
+        """Logs in order of replay: the one interrupted by compaction goes first"""
+        return self.compacting_log_path, self.log_path
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._queue.put_nowait(None)
+        await self._task
+
+    def _check_running(self):
+        """Fails the write loudly instead of queueing entries nobody is going to write"""
+        if self._task is not None and self._task.done():
+            error = None if self._task.cancelled() else self._task.exception()
+            raise RuntimeError(f"Writer of {self.log_path} is stopped") from error
+
+    def put(self, table: str, row: BaseModel):
+        self._check_running()
+        self._queue.put_nowait(json.dumps([PUT, table, row.id, json.loads(row.json())], ensure_ascii=False))
+
+    def delete(self, table: str, _id: int):
+        self._check_running()
+        self._queue.put_nowait(json.dumps([DELETE, table, _id, None]))
+
+    async def _run(self):
+        """
+        I/O errors don't stop the writer: entries failed to be appended are kept and appended again
+        before the newer ones, a failed compaction is retried with the next one. On stop errors are raised.
+        """
+        last_compaction, stopping, pending = monotonic(), False, []
+        while not stopping:
+            try:
+                timeout = RETRY_INTERVAL if pending else self.compaction_interval
+                pending.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                pass
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            if stopping := None in pending:
+                pending = [entry for entry in pending if entry is not None]
+            if pending:
+                try:
+                    await asyncio.to_thread(self._append, pending)
+                except OSError:
+                    if stopping:
+                        raise
+                    logger.exception("Failed to append %d entries to %s, retrying", len(pending), self.log_path)
+                    continue
+                pending, self._dirty = [], True
+            if self._dirty and (stopping or monotonic() - last_compaction >= self.compaction_interval):
+                try:
+                    await asyncio.to_thread(self._compact)
+                except OSError:
+                    if stopping:
+                        raise
+                    logger.exception("Failed to compact %s into %s", self.log_path, self.snapshot_path)
+                    last_compaction = monotonic()
+                    continue
+                last_compaction, self._dirty = monotonic(), False
+
+    def _append(self, entries: list[str]):
+        append_lines(self.log_path, ("\n".join(entries) + "\n").encode("utf-8"))
+
+    def _compact(self):
+        if self.log_path.exists():
+            if self.compacting_log_path.exists():
+                append_lines(self.compacting_log_path, self.log_path.read_bytes())
+                self.log_path.unlink()
+            else:
+                self.log_path.replace(self.compacting_log_path)
+        if not self.compacting_log_path.exists():
+            return
+        tables = apply_log_to_tables(read_snapshot_tables(self.snapshot_path), self.compacting_log_path)
+        write_snapshot_tables(self.snapshot_path, tables, self.trusted_snapshot)
+        self.compacting_log_path.unlink()
@@ -0,0 +1,78 @@
+import sys
+from functools import lru_cache
+from typing import Callable, ClassVar, Sequence, Type
+
+from model.db_entities.models import BaseDBModel
+from model.db_entities.utils import make_value_converter
+
+
+class CompactRecord:
+    """
+    Row of in-memory table keeping field values in slots instead of per-instance __dict__ and __fields_set__.
+    Enum values are shared members already, strings of fields listed in Meta.interned are interned,
+    models are built from records only when they leave the storage.
+    """
+
+    __slots__ = ()
+    model: ClassVar[Type[BaseDBModel]]
+    interned: ClassVar[frozenset[str]] = frozenset()
+
+    @classmethod
+    def prepare(cls, field: str, value):
+        if field in cls.interned and isinstance(value, str):
+            return sys.intern(value)
+        return value
+
+    @classmethod
+    def from_model(cls, row: BaseDBModel) -> "CompactRecord":
+        record = cls.__new__(cls)
+        for field in cls.__slots__:
+            setattr(record, field, cls.prepare(field, getattr(row, field)))
+        return record
+
+    def as_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def to_model(self) -> BaseDBModel:
+        """Builds model without validation, like `model.construct` does"""
+        row = self.model.__new__(self.model)
+        object.__setattr__(row, "__dict__", self.as_dict())
+        object.__setattr__(row, "__fields_set__", set(self.__slots__))
+        return row
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{key}={value!r}' for key, value in self.as_dict().items())})"
+
+
+@lru_cache(maxsize=None)
+def make_record_class(model: Type[BaseDBModel]) -> Type[CompactRecord]:
+    return type(
+        f"{model.__name__}Record",
+        (CompactRecord,),
+        {
+            "__slots__": tuple(model.__fields__),
+            "model": model,
+            "interned": frozenset(getattr(model.Meta, "interned", ())),
+        },
+    )
+
+
+def make_record_factory(
+    record_class: Type[CompactRecord], columns: Sequence[str]
+) -> Callable[[Sequence], CompactRecord]:
+    """Builds records from trusted rows of json values ordered as `columns`"""
+    fields = record_class.model.__fields__
+    plan = [
+        (field, columns.index(field), make_value_converter(fields[field].outer_type_))
+        for field in record_class.__slots__
+    ]
+    prepare, new = record_class.prepare, record_class.__new__
+
+    def make_record(values: Sequence) -> CompactRecord:
+        record = new(record_class)
+        for field, position, converter in plan:
+            value = values[position]
+            setattr(record, field, prepare(field, converter(value) if converter else value))
+        return record
+
+    return make_record
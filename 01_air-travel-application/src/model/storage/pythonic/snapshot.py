@@ -0,0 +1,140 @@
+"""
+Trusted snapshot is a header line followed by columnar json body:
+{"schema_version": 1, "checksum": "<sha256 of body>", "counts": {"<table>": <rows count>}}
+{"<table>": {"columns": ["id", ...], "rows": [[1, ...], ...]}}
+The header is checked once per load, so rows of the body can be built without validation.
+"""
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator, Mapping
+
+SCHEMA_VERSION = 1
+
+columnar_tables_typing = dict[str, dict[str, list]]
+
+
+class SnapshotError(ValueError):
+    def __init__(self, path: str | Path, reason: str):
+        super().__init__(f"Snapshot {path} can not be trusted: {reason}")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def write_atomically(path: str | Path, data: bytes, tail: BinaryIO | None = None):
+    """
+    Writes `data` and the rest of `tail` file to a temporary file and renames it,
+    so a crash never leaves a half written snapshot
+    """
+    path = Path(path)
+    temporary_path = path.with_suffix(path.suffix + ".tmp")
+    with open(temporary_path, "wb") as file:
+        file.write(data)
+        if tail is not None:
+            shutil.copyfileobj(tail, file)
+        file.flush()
+        os.fsync(file.fileno())
+    temporary_path.replace(path)
+
+
+def read_trusted_snapshot(path: str | Path) -> columnar_tables_typing | None:
+    """Columnar tables of a trusted snapshot, None if the file is a legacy json snapshot"""
+    header_line, _, body = Path(path).read_bytes().partition(b"\n")
+    # the header is written with schema_version first, so a long legacy line is not parsed here for nothing
+    if not header_line.startswith(b'{"schema_version"'):
+        return None
+    try:
+        header = json.loads(header_line)
+    except ValueError:
+        return None
+    if not isinstance(header, dict) or "schema_version" not in header:
+        return None
+    if header["schema_version"] != SCHEMA_VERSION:
+        raise SnapshotError(path, f"schema version {header['schema_version']} is not {SCHEMA_VERSION}")
+    if hashlib.sha256(body).hexdigest() != header.get("checksum"):
+        raise SnapshotError(path, "checksum mismatch")
+    tables = json.loads(body)
+    if {table: len(columnar["rows"]) for table, columnar in tables.items()} != header.get("counts"):
+        raise SnapshotError(path, "rows count mismatch")
+    return tables
+
+
+def write_trusted_snapshot(path: str | Path, tables: columnar_tables_typing):
+    body = json.dumps(tables, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode()
+    header = {
+        "schema_version": SCHEMA_VERSION,
+        "checksum": hashlib.sha256(body).hexdigest(),
+        "counts": {table: len(columnar["rows"]) for table, columnar in tables.items()},
+    }
+    write_atomically(path, json.dumps(header).encode() + b"\n" + body)
+
+
+def _iter_columnar_json(
+    tables: Mapping[str, tuple[list[str], Iterable[list]]], counts: dict[str, int]
+) -> Iterator[str]:
+    """Columnar json of the tables piece by piece, rows of each table are counted in `counts`"""
+    yield "{"
+    for position, (table, (columns, rows)) in enumerate(tables.items()):
+        yield f'{"," if position else ""}{json.dumps(table)}:{{"columns":{json.dumps(columns)},"rows":['
+        counts[table] = 0
+        for row in rows:
+            yield ("," if counts[table] else "") + json.dumps(
+                row, ensure_ascii=False, separators=(",", ":"), default=_json_default
+            )
+            counts[table] += 1
+        yield "]}"
+    yield "}"
+
+
+def write_trusted_snapshot_rows(path: str | Path, tables: Mapping[str, tuple[list[str], Iterable[list]]]):
+    """
+    Trusted snapshot of tables given as (columns, rows), which are streamed into a temporary body file,
+    so they are never held in memory. The header is written when the checksum of the body is known.
+    """
+    path = Path(path)
+    body_path = path.with_suffix(path.suffix + ".body")
+    checksum, counts = hashlib.sha256(), {}
+    try:
+        with open(body_path, "wb") as body:
+            for chunk in _iter_columnar_json(tables, counts):
+                data = chunk.encode()
+                checksum.update(data)
+                body.write(data)
+        header = {"schema_version": SCHEMA_VERSION, "checksum": checksum.hexdigest(), "counts": counts}
+        with open(body_path, "rb") as body:
+            write_atomically(path, json.dumps(header).encode() + b"\n", body)
+    finally:
+        body_path.unlink(missing_ok=True)
+
+
+def columnar_tables_to_dicts(tables: columnar_tables_typing) -> dict[str, list[dict]]:
+    return {
+        table: [dict(zip(columnar["columns"], row)) for row in columnar["rows"]]
+        for table, columnar in tables.items()
+    }
+
+
+def read_snapshot_tables(path: str | Path) -> dict[str, list[dict]]:
+    """Rows of snapshot in any format as plain dicts"""
+    if (tables := read_trusted_snapshot(path)) is None:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    return columnar_tables_to_dicts(tables)
+
+
+def write_snapshot_tables(path: str | Path, tables: dict[str, list[dict]], trusted: bool = False):
+    if not trusted:
+        write_atomically(path, json.dumps(tables, ensure_ascii=False, default=_json_default).encode())
+        return
+    columnar_tables = {}
+    for table, rows in tables.items():
+        columns = list(rows[0]) if rows else []
+        columnar_tables[table] = {"columns": columns, "rows": [[row[column] for column in columns] for row in rows]}
+    write_trusted_snapshot(path, columnar_tables)
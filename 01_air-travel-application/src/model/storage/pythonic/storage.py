@@ -1,20 +1,39 @@
 import operator
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice, pairwise
 from pathlib import Path
-from typing import Generic, Iterator, Protocol, Type
+from typing import Collection, Generic, Iterator, Protocol, Sequence, Type
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, PrivateAttr, validator
 from pydantic.generics import GenericModel
 
 from controller.dependencies.filters import filter_map_typing
-from controller.dependencies.pagination import Pagination
+from controller.dependencies.pagination import KeysetPagination, pagination_typing
 from model.db_entities.models import CompanyModel, PassInTripModel, TripModel, UserModel, BaseDBModel
+from model.db_entities.utils import make_row_factory
 from model.storage.base import BaseDatabaseHandler, ModelVar
 from model.storage.exceptions import EntityNotFoundError
-from model.storage.pythonic.utils import filter_python_list, make_pagination_slice
+from model.storage.pythonic.indexes import HashIndex, SortedIndex, UniqueIndex
+from model.storage.pythonic.persistence import DELETE, WriteBehindLog, read_log
+from model.storage.pythonic.records import CompactRecord, make_record_class, make_record_factory
+from model.storage.pythonic.snapshot import columnar_tables_to_dicts, read_trusted_snapshot, write_trusted_snapshot
+from model.storage.pythonic.utils import (
+    compile_filter_predicate,
+    count_python_list,
+    filter_python_list,
+    make_pagination_slice,
+)
 
 
 class GenericStorageList(GenericModel, Generic[ModelVar], arbitrary_types_allowed=True):
     __root__: list[ModelVar] = Field(default_factory=list)
+    _id_index: UniqueIndex = PrivateAttr(default_factory=UniqueIndex)
+    _indexes: dict[str, HashIndex | SortedIndex] = PrivateAttr(default_factory=dict)
+    _record_class: Type[CompactRecord] | None = PrivateAttr(default=None)
+
+    def __init__(self, **data):
+        super().__init__(**data)
+        self.build_indexes()
 
     @validator("__root__", each_item=True)
     def check_id(cls, value: ModelVar):
@@ -28,93 +47,327 @@ class GenericStorageList(GenericModel, Generic[ModelVar], arbitrary_types_allowe
         """To validate whole list as united value"""
         return sorted(value, key=operator.attrgetter("id"))
 
+    @classmethod
+    def from_columns(cls, columns: list[str], rows: list[list], compact: bool = False) -> "GenericStorageList":
+        """Builds list from rows of a trusted snapshot without validation, rows are sorted only if they are not"""
+        row_model = cls.__fields__["__root__"].type_
+        record_class = make_record_class(row_model) if compact else None
+        make_row = make_record_factory(record_class, columns) if compact else make_row_factory(row_model, columns)
+        elems = list(map(make_row, rows))
+        if any(previous.id >= current.id for previous, current in pairwise(elems)):
+            elems.sort(key=operator.attrgetter("id"))
+        storage_list = cls.construct(__root__=elems)
+        storage_list._record_class = record_class
+        storage_list.build_indexes()
+        return storage_list
+
+    def compact(self):
+        """Replaces models with compact records in place, models are built back only for rows being returned"""
+        if self._record_class:
+            return
+        self._record_class = make_record_class(self.row_model)
+        for position, elem in enumerate(self.__root__):
+            self.__root__[position] = self._record_class.from_model(elem)
+        self.build_indexes()
+
+    def _to_model(self, elem: ModelVar | CompactRecord | None) -> ModelVar | None:
+        if self._record_class and elem is not None:
+            return elem.to_model()
+        return elem
+
+    def _to_models(self, elems: list) -> list[ModelVar]:
+        if self._record_class:
+            return [elem.to_model() for elem in elems]
+        return elems
+
+    def _to_stored(self, value: ModelVar) -> ModelVar | CompactRecord:
+        if self._record_class:
+            return self._record_class.from_model(value)
+        return value
+
+    def to_columns(self) -> dict[str, list]:
+        columns = list(self.row_model.__fields__)
+        return {"columns": columns, "rows": [[getattr(elem, column) for column in columns] for elem in self.__root__]}
+
     @property
     def next_id(self):
         if self.__root__:
             return self.__root__[-1].id + 1
         return 1
 
+    @property
+    def row_model(self) -> Type[ModelVar]:
+        return self.__fields__["__root__"].type_
+
     def __iter__(self) -> Iterator[ModelVar]:
         return self.__root__.__iter__()
 
-    def select(self, filter_map: filter_map_typing, pagination: Pagination):
-        """Simple equality filter implementation"""
-        return filter_python_list(filter_map, self.__root__)[make_pagination_slice(pagination)]
+    def build_indexes(self):
+        """Indexes rows by id and by fields listed in Meta.indexes and Meta.sorted_indexes of the stored model"""
+        meta = self.row_model.Meta
+        self._id_index = UniqueIndex()
+        self._indexes = {"id": self._id_index}
+        for field in getattr(meta, "indexes", ()):
+            self._indexes[field] = HashIndex(field)
+        for field in getattr(meta, "sorted_indexes", ()):
+            self._indexes[field] = SortedIndex(field)
+        for index in self._indexes.values():
+            index.add_many(self.__root__)
+
+    def _index_row(self, elem: ModelVar):
+        for index in self._indexes.values():
+            index.add(elem)
+
+    def select(self, filter_map: filter_map_typing, pagination: pagination_typing):
+        """Filters rows lazily, so it stops as soon as the page is filled"""
+        if isinstance(pagination, KeysetPagination):
+            return self._to_models(list(islice(self._iter_after(filter_map, pagination), pagination.limit)))
+        page = make_pagination_slice(pagination)
+        rows = filter_python_list(filter_map, self.__root__, self._indexes)
+        return self._to_models(list(islice(rows, page.start, page.stop)))
+
+    def _iter_after(self, filter_map: filter_map_typing, pagination: KeysetPagination) -> Iterator[ModelVar]:
+        """Rows after the cursor, ("id",) and (field with sorted index, "id") keys are served by indexes"""
+        match pagination.key:
+            case ("id",):
+                if not pagination.after:
+                    return filter_python_list(filter_map, self.__root__, self._indexes)
+                (after_id,) = pagination.after
+                filter_map = {**filter_map, "gt_": [*filter_map.get("gt_", ()), ("id", after_id)]}
+                start = bisect_right(self.__root__, after_id, key=operator.attrgetter("id"))
+                return filter_python_list(filter_map, self.__root__, self._indexes, start)
+            case (field, "id") if isinstance(index := self._indexes.get(field), SortedIndex):
+                rows = index.iter_after(pagination.after)
+                if predicate := compile_filter_predicate(filter_map):
+                    return filter(predicate, rows)
+                return rows
+            case key_fields:
+                # no sorted index for the key: matching rows after the cursor are sorted as a whole
+                def key(elem) -> tuple:
+                    return tuple(getattr(elem, field) for field in key_fields)
+
+                rows = filter_python_list(filter_map, self.__root__, self._indexes)
+                if pagination.after:
+                    rows = (row for row in rows if key(row) > pagination.after)
+                return iter(sorted(rows, key=key))
+
+    def count(self, filter_map: filter_map_typing) -> int:
+        return count_python_list(filter_map, self.__root__, self._indexes)
 
     def select_by_id(self, _id: int) -> ModelVar:
-        for elem_index in range(len(self.__root__)):
-            if self.__root__[elem_index].id == _id:
-                return self.__root__[elem_index]
+        return self._to_model(self._id_index.get(_id))
+
+    def select_by_ids(self, ids: Collection[int]) -> list[ModelVar]:
+        return self._to_models([elem for _id in ids if (elem := self._id_index.get(_id)) is not None])
 
     def insert(self, value: ModelVar) -> ModelVar:
-        self.__root__.append(value)
+        elem = self._to_stored(value)
+        self.__root__.append(elem)
+        self._index_row(elem)
         return value
 
+    def restore(self, value: ModelVar):
+        """Puts row replayed from a log: replaces row with the same id or inserts it in id order"""
+        self.delete(value.id)
+        insort(self.__root__, elem := self._to_stored(value), key=operator.attrgetter("id"))
+        self._index_row(elem)
+
+    def insert_many(self, values: list[ModelVar]) -> list[ModelVar]:
+        """Values must have ids greater than ids of stored rows, indexes are updated once for all of them"""
+        elems = list(map(self._to_stored, values))
+        self.__root__.extend(elems)
+        for index in self._indexes.values():
+            index.add_many(elems)
+        return values
+
     def update(self, _id: int, value: dict) -> ModelVar | None:
-        for elem_index in range(len(self.__root__)):
-            if self.__root__[elem_index].id == _id:
-                model_to_change = self.__root__[elem_index]
-                for field, new_value in value.items():
-                    setattr(model_to_change, field, new_value)
-                return model_to_change
+        if (model_to_change := self._id_index.get(_id)) is None:
+            return None
+        changed_indexes = [index for field, index in self._indexes.items() if field in value]
+        for index in changed_indexes:
+            index.remove(model_to_change)
+        for field, new_value in value.items():
+            if self._record_class:
+                new_value = self._record_class.prepare(field, new_value)
+            setattr(model_to_change, field, new_value)
+        for index in changed_indexes:
+            index.add(model_to_change)
+        return self._to_model(model_to_change)
 
     def delete(self, _id: int) -> bool:
-        for elem_index in range(len(self.__root__)):
-            if self.__root__[elem_index].id == _id:
-                del self.__root__[elem_index]
-                return True
-        return False
+        if (model_to_delete := self._id_index.get(_id)) is None:
+            return False
+        for index in self._indexes.values():
+            index.remove(model_to_delete)
+        del self.__root__[bisect_left(self.__root__, _id, key=operator.attrgetter("id"))]
+        return True
 
+    def delete_many(self, ids: Collection[int]) -> list[int]:
+        """Deletes rows with one pass over the list and each index, returns ids of deleted rows"""
+        elems_to_delete = {_id: elem for _id in ids if (elem := self._id_index.get(_id)) is not None}
+        if elems_to_delete:
+            for index in self._indexes.values():
+                index.remove_many(elems_to_delete.values())
+            self.__root__[:] = [elem for elem in self.__root__ if elem.id not in elems_to_delete]
+        return list(elems_to_delete)
 
-class Storage(BaseModel):
+
+class Storage(BaseModel, json_encoders={CompactRecord: CompactRecord.as_dict}):
     companies: GenericStorageList[CompanyModel]
     trips: GenericStorageList[TripModel]
     pass_in_trip: GenericStorageList[PassInTripModel]
     users: GenericStorageList[UserModel]
 
+    @classmethod
+    def load(cls, path: str | Path, trusted: bool = False, compact: bool = False) -> "Storage":
+        """
+        Loads a trusted snapshot or legacy json whatever `trusted` is, it only skips validation of rows
+        of a trusted snapshot, which is checked once as a whole instead. Other rows are parsed.
+        """
+        if (tables := read_trusted_snapshot(path)) is None:
+            storage = cls.parse_file(path)
+        elif trusted:
+            return cls.construct(
+                **{
+                    name: field.type_.from_columns(**tables[name], compact=compact)
+                    for name, field in cls.__fields__.items()
+                }
+            )
+        else:
+            storage = cls.parse_obj(columnar_tables_to_dicts(tables))
+        if compact:
+            for name in storage.__fields__:
+                getattr(storage, name).compact()
+        return storage
+
+    def dump(self, path: str | Path, trusted: bool = False):
+        if trusted:
+            write_trusted_snapshot(path, {name: getattr(self, name).to_columns() for name in self.__fields__})
+        else:
+            with open(path, "w") as file:
+                file.write(self.json(indent=4, ensure_ascii=False))
+
 
 class SettingsProtocol(Protocol):
     file_path: str | Path = "storage.json"
     rollback: bool = True
+    write_behind: bool = False
+    write_behind_log_path: str | Path = "storage.log"
+    compaction_interval: float = 60.0
+    trusted_snapshot: bool = False
+    compact_rows: bool = False
 
 
 class StorageHandler(BaseDatabaseHandler):
     def __init__(self, storage: Storage | None = None):
+        super().__init__()
         self.storage = storage
+        self.write_behind: WriteBehindLog | None = None
 
     async def connect(self, settings: SettingsProtocol):
         if not self.storage:
-            self.storage = Storage.parse_file(settings.file_path)
+            self.storage = Storage.load(settings.file_path, settings.trusted_snapshot, settings.compact_rows)
+        if settings.write_behind:
+            self.write_behind = WriteBehindLog(
+                settings.file_path,
+                settings.write_behind_log_path,
+                settings.compaction_interval,
+                settings.trusted_snapshot,
+            )
+            for log_path in self.write_behind.log_paths:
+                self._replay(log_path)
+            self.write_behind.start()
+
+    def _replay(self, log_path: Path):
+        for operation, table, _id, row in read_log(log_path):
+            pytonic_storage_list: GenericStorageList = getattr(self.storage, table)
+            if operation == DELETE:
+                pytonic_storage_list.delete(_id)
+            else:
+                pytonic_storage_list.restore(pytonic_storage_list.row_model.parse_obj(row))
 
     async def disconnect(self, settings: SettingsProtocol):
-        if not settings.rollback:
-            with open(settings.file_path, "w") as file:
-                file.write(self.storage.json(indent=4, ensure_ascii=False))
+        # rollback is off with write_behind, DatabaseSettings rejects the combination
+        if self.write_behind:
+            await self.write_behind.stop()
+        elif not settings.rollback:
+            self.storage.dump(settings.file_path, settings.trusted_snapshot)
 
     async def select(
-        self, model: Type[BaseDBModel], filter_map: filter_map_typing, pagination: Pagination
+        self, model: Type[BaseDBModel], filter_map: filter_map_typing, pagination: pagination_typing
     ) -> list[BaseDBModel]:
         pytonic_storage_list: GenericStorageList = getattr(self.storage, model.Meta.table)
         return pytonic_storage_list.select(filter_map, pagination)
 
+    async def count(self, model: Type[BaseDBModel], filter_map: filter_map_typing) -> int:
+        pytonic_storage_list: GenericStorageList = getattr(self.storage, model.Meta.table)
+        return pytonic_storage_list.count(filter_map)
+
     async def select_by_id(self, model: Type[BaseDBModel], _id: int) -> BaseDBModel:
         pytonic_storage_list: GenericStorageList = getattr(self.storage, table := model.Meta.table)
         if result := pytonic_storage_list.select_by_id(_id):
             return result
         raise EntityNotFoundError(table, _id)
 
-    async def insert(self, model: Type[BaseDBModel], value: dict) -> ModelVar:
+    async def select_by_ids(self, model: Type[BaseDBModel], ids: Collection[int]) -> list[BaseDBModel]:
+        if not ids:
+            return []
         pytonic_storage_list: GenericStorageList = getattr(self.storage, model.Meta.table)
-        return pytonic_storage_list.insert(model(id=pytonic_storage_list.next_id, **value))
+        return pytonic_storage_list.select_by_ids(ids)
+
+    async def insert(self, model: Type[BaseDBModel], value: dict) -> ModelVar:
+        pytonic_storage_list: GenericStorageList = getattr(self.storage, table := model.Meta.table)
+        result = pytonic_storage_list.insert(model(id=pytonic_storage_list.next_id, **value))
+        self.table_versions[table] += 1
+        if self.write_behind:
+            self.write_behind.put(table, result)
+        return result
 
     async def update_by_id(self, model: Type[BaseDBModel], _id: int, value: dict) -> ModelVar | None:
         pytonic_storage_list: GenericStorageList = getattr(self.storage, table := model.Meta.table)
         if result := pytonic_storage_list.update(_id, value):
+            self.table_versions[table] += 1
+            if self.write_behind:
+                self.write_behind.put(table, result)
             return result
         raise EntityNotFoundError(table, _id)
 
     async def delete_by_id(self, model: Type[BaseDBModel], _id: int) -> bool:
         pytonic_storage_list: GenericStorageList = getattr(self.storage, table := model.Meta.table)
         if result := pytonic_storage_list.delete(_id):
+            self.table_versions[table] += 1
+            if self.write_behind:
+                self.write_behind.delete(table, _id)
             return result
         raise EntityNotFoundError(table, _id)
+
+    async def insert_many(self, model: Type[BaseDBModel], values: Sequence[dict]) -> list[ModelVar]:
+        pytonic_storage_list: GenericStorageList = getattr(self.storage, table := model.Meta.table)
+        first_id = pytonic_storage_list.next_id
+        result = pytonic_storage_list.insert_many(
+            [model(id=first_id + position, **value) for position, value in enumerate(values)]
+        )
+        self._log_changes(table, result, ())
+        return result
+
+    async def update_many(self, model: Type[BaseDBModel], values: Sequence[tuple[int, dict]]) -> list[ModelVar]:
+        pytonic_storage_list: GenericStorageList = getattr(self.storage, table := model.Meta.table)
+        result = [row for _id, value in values if (row := pytonic_storage_list.update(_id, value))]
+        self._log_changes(table, result, ())
+        return result
+
+    async def delete_many(self, model: Type[BaseDBModel], ids: Collection[int]) -> list[int]:
+        pytonic_storage_list: GenericStorageList = getattr(self.storage, table := model.Meta.table)
+        result = pytonic_storage_list.delete_many(ids)
+        self._log_changes(table, (), result)
+        return result
+
+    def _log_changes(self, table: str, put_rows: Sequence[BaseDBModel], deleted_ids: Sequence[int]):
+        if not put_rows and not deleted_ids:
+            return
+        self.table_versions[table] += 1
+        if self.write_behind:
+            for row in put_rows:
+                self.write_behind.put(table, row)
+            for _id in deleted_ids:
+                self.write_behind.delete(table, _id)
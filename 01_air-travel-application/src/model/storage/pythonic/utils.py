@@ -1,40 +1,174 @@
 import operator
-from typing import Any, Callable
+from functools import lru_cache, partial
+from typing import Any, Callable, Collection, Iterator
 
 from controller.dependencies.filters import FilterArgsMapEnum, filter_map_typing
 from controller.dependencies.pagination import Pagination
+from model.storage.pythonic.indexes import HashIndex, SortedIndex
 
 
-def _like_operator_func(a: Any, b: Any) -> bool:
-    return str(a).lower() in str(b).lower()
+PREDICATE_CACHE_SIZE = 256
 
 
+def _like_operator_func(a: Any, b: str) -> bool:
+    return b in str(a).lower()
+
+
+def _in_operator_func(a: Any, b: frozenset) -> bool:
+    return a in b
+
+
+# Each function is called as func(value of row field, prepared value of filter), as SQL "field <operator> value"
 _filter_func_map: dict[FilterArgsMapEnum, Callable[[Any, Any], bool]] = {
     "eq_": operator.eq,
     "lt_": operator.lt,
     "le_": operator.le,
     "gt_": operator.gt,
     "ge_": operator.ge,
-    "in_": operator.contains,
+    "in_": _in_operator_func,
     "like_": _like_operator_func,
 }
 
+# Prepares value of filter once per request instead of once per compared row
+_filter_value_preparers: dict[FilterArgsMapEnum, Callable[[Any], Any]] = {
+    "in_": frozenset,
+    "like_": lambda value: str(value).lower(),
+}
+
+# filter type: (is lower bound, is bound included)
+_range_filter_map: dict[FilterArgsMapEnum, tuple[bool, bool]] = {
+    "lt_": (False, False),
+    "le_": (False, True),
+    "gt_": (True, False),
+    "ge_": (True, True),
+}
+
+
+class _ListTail:
+    """Lazy python_list[start:], which does not copy the list"""
+
+    def __init__(self, python_list: list, start: int):
+        self.python_list, self.start = python_list, start
+
+    def __len__(self) -> int:
+        return max(len(self.python_list) - self.start, 0)
+
+    def __iter__(self) -> Iterator:
+        python_list = self.python_list
+        for position in range(self.start, len(python_list)):
+            yield python_list[position]
+
+
+def _collect_ranges(filter_map: filter_map_typing, indexes: dict[str, HashIndex | SortedIndex]) -> dict[str, dict]:
+    """Merges range filters on fields with sorted index into SortedIndex.bounds arguments"""
+    ranges = {}
+    for filter_type, (is_lower, is_included) in _range_filter_map.items():
+        for field, value in filter_map.get(filter_type, ()):
+            if not isinstance(indexes.get(field), SortedIndex):
+                continue
+            bounds = ranges.setdefault(field, {})
+            bound_name = "lower" if is_lower else "upper"
+            current = bounds.get(bound_name)
+            if current is None or (value > current if is_lower else value < current):
+                bounds[bound_name], bounds[f"include_{bound_name}"] = value, is_included
+            elif value == current:
+                bounds[f"include_{bound_name}"] = bounds[f"include_{bound_name}"] and is_included
+    return ranges
+
+
+def _narrow_by_indexes(
+    filter_map: filter_map_typing, python_list: list, indexes: dict[str, HashIndex | SortedIndex]
+) -> Collection:
+    """Picks the smallest set of rows matching one of indexed filters, rows keep id order"""
+    candidates_count, make_candidates = len(python_list), None
+    for filter_type in ("eq_", "in_"):
+        for field, value in filter_map.get(filter_type, ()):
+            if not isinstance(index := indexes.get(field), HashIndex):
+                continue
+            if filter_type == "eq_":
+                rows = index.lookup(value)
+            else:
+                rows = sorted(
+                    (row for element in set(value) for row in index.lookup(element)), key=operator.attrgetter("id")
+                )
+            if len(rows) < candidates_count:
+                candidates_count, make_candidates = len(rows), partial(tuple, rows)
+    for field, bounds in _collect_ranges(filter_map, indexes).items():
+        start, stop = indexes[field].bounds(**bounds)
+        if stop - start < candidates_count:
+            candidates_count, make_candidates = stop - start, partial(indexes[field].rows, start, stop)
+    return make_candidates() if make_candidates else python_list
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+@lru_cache(maxsize=PREDICATE_CACHE_SIZE)
+def _compile_filter_shape(filter_shape: tuple[tuple[FilterArgsMapEnum, str], ...]) -> tuple[tuple[Callable, ...], ...]:
+    """(field getter, filter function, value preparer) for each (filter type, field) of filter map"""
+    return tuple(
+        (operator.attrgetter(field), _filter_func_map[filter_type], _filter_value_preparers.get(filter_type, _identity))
+        for filter_type, field in filter_shape
+    )
+
+
+def compile_filter_predicate(filter_map: filter_map_typing) -> Callable[[Any], bool] | None:
+    """Fuses all filters into one short-circuiting predicate, None if there is nothing to filter by"""
+    filter_shape = tuple(
+        (filter_type, field) for filter_type, field_value_list in filter_map.items() for field, _ in field_value_list
+    )
+    if not filter_shape:
+        return None
+    values = (value for field_value_list in filter_map.values() for _, value in field_value_list)
+    checks = tuple(
+        (get_field_value, filter_func, prepare(value))
+        for (get_field_value, filter_func, prepare), value in zip(_compile_filter_shape(filter_shape), values)
+    )
+
+    def predicate(elem: Any) -> bool:
+        for get_field_value, filter_func, value in checks:
+            if not filter_func(get_field_value(elem), value):
+                return False
+        return True
+
+    return predicate
+
+
+def filter_python_list(
+    filter_map: filter_map_typing,
+    python_list: list,
+    indexes: dict[str, HashIndex | SortedIndex] | None = None,
+    start: int = 0,
+) -> Iterator:
+    """Lazily yields rows matching all filters, in id order, skipping `start` first rows of the list"""
+    if start:
+        python_list = _ListTail(python_list, start)
+    candidates = _narrow_by_indexes(filter_map, python_list, indexes) if indexes else python_list
+    if predicate := compile_filter_predicate(filter_map):
+        return filter(predicate, candidates)
+    return iter(candidates)
 
-def filter_python_list(filter_map: filter_map_typing, python_list: list) -> list:
-    new_list = python_list
-    for filter_type, field_value_list_of_tuples in filter_map.items():
-        check_list, new_list = new_list, []
-        filter_func = _filter_func_map[filter_type]
-        for elem in check_list:
-            filtering_result = []
-            for field, value in field_value_list_of_tuples:
-                filter_func_result = filter_func(value, getattr(elem, field, None))
-                filtering_result.append(filter_func_result)
-            if all(filtering_result):
-                new_list.append(elem)
 
-    return new_list
+def count_python_list(
+    filter_map: filter_map_typing, python_list: list, indexes: dict[str, HashIndex | SortedIndex] | None = None
+) -> int:
+    """Answers from index alone when filter map is a single eq_ or ranges on one field, counts filtered rows else"""
+    if not filter_map:
+        return len(python_list)
+    indexes = indexes or {}
+    filters = [(filter_type, field, value) for filter_type, pairs in filter_map.items() for field, value in pairs]
+    if len(filters) == 1 and filters[0][0] == "eq_" and isinstance(index := indexes.get(filters[0][1]), HashIndex):
+        return len(index.lookup(filters[0][2]))
+    ranges = _collect_ranges(filter_map, indexes)
+    if len(ranges) == 1 and all(
+        filter_type in _range_filter_map and field in ranges for filter_type, field, _ in filters
+    ):
+        start, stop = indexes[(field := next(iter(ranges)))].bounds(**ranges[field])
+        return stop - start
+    return sum(1 for _ in filter_python_list(filter_map, python_list, indexes))
 
 
 def make_pagination_slice(pagination: Pagination) -> slice:
-    return slice(pagination.offset, pagination.offset + pagination.limit)
+    """Bounds are clamped to 0, islice rejects negative ones"""
+    return slice(max(0, pagination.offset), max(0, pagination.offset + pagination.limit))
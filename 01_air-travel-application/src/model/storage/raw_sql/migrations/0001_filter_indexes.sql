@@ -0,0 +1,13 @@
+-- Indexes for foreign keys and for filters of list endpoints.
+-- Filters by substring (LIKE '%...%') can't use a b-tree index, so they have none.
+
+CREATE INDEX IF NOT EXISTS trips_company_idx ON trips (company);
+CREATE INDEX IF NOT EXISTS trips_plane_idx ON trips (plane);
+-- rowid is the last column of every index, so it also serves keyset pages ordered by (time_out, id)
+CREATE INDEX IF NOT EXISTS trips_time_out_idx ON trips (time_out);
+CREATE INDEX IF NOT EXISTS trips_time_in_idx ON trips (time_in);
+
+CREATE INDEX IF NOT EXISTS pass_in_trip_trip_idx ON pass_in_trip (trip);
+CREATE INDEX IF NOT EXISTS pass_in_trip_passenger_idx ON pass_in_trip (passenger, place);
+
+CREATE INDEX IF NOT EXISTS users_role_idx ON users (role);
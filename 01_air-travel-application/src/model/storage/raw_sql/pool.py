@@ -0,0 +1,118 @@
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from sqlite3 import Connection
+from time import perf_counter
+from typing import AsyncIterator, Callable, TypeVar
+
+ResultVar = TypeVar("ResultVar")
+
+
+@dataclass
+class PoolMetrics:
+    checkouts: int = 0
+    write_checkouts: int = 0
+    wait_time_total: float = 0.0
+    wait_time_max: float = 0.0
+    in_flight: int = 0
+
+    def record_checkout(self, wait_time: float, write: bool):
+        self.checkouts += 1
+        self.write_checkouts += write
+        self.wait_time_total += wait_time
+        self.wait_time_max = max(self.wait_time_max, wait_time)
+
+    def as_dict(self) -> dict:
+        result = asdict(self)
+        result["wait_time_avg"] = self.wait_time_total / self.checkouts if self.checkouts else 0.0
+        return result
+
+
+class SQLiteConnectionPool:
+    """
+    Runs statements on dedicated threads, each owning its own connection:
+    one writer thread and `size` reader threads over a database in WAL mode,
+    so readers don't block on the writer and the event loop blocks on neither.
+    `queue_size` bounds the number of statements queued or running at once.
+    """
+
+    def __init__(self, address: str, size: int = 4, queue_size: int = 64, cached_statements: int = 128):
+        self.address = address
+        self.cached_statements = cached_statements
+        self.metrics = PoolMetrics()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[Connection] = []
+        self._slots = asyncio.Semaphore(queue_size)
+        self._reader_slots = asyncio.BoundedSemaphore(size)
+        self._writer = ThreadPoolExecutor(1, "sqlite-writer", initializer=self._open_connection, initargs=(False,))
+        self._readers = ThreadPoolExecutor(size, "sqlite-reader", initializer=self._open_connection, initargs=(True,))
+
+    def _connect(self) -> Connection:
+        return sqlite3.connect(
+            self.address,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+        )
+
+    def _open_connection(self, read_only: bool):
+        connection = self._connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        if read_only:
+            connection.execute("PRAGMA query_only=ON")
+        self._local.connection = connection
+        with self._lock:
+            self._connections.append(connection)
+
+    def _call(self, func: Callable[[Connection], ResultVar], write: bool, queued_at: float) -> ResultVar:
+        with self._lock:
+            self.metrics.record_checkout(perf_counter() - queued_at, write)
+        return func(self._local.connection)
+
+    async def run(self, func: Callable[[Connection], ResultVar], write: bool = False) -> ResultVar:
+        queued_at = perf_counter()
+        async with self._slots:
+            self.metrics.in_flight += 1
+            try:
+                executor = self._writer if write else self._readers
+                return await asyncio.get_running_loop().run_in_executor(executor, self._call, func, write, queued_at)
+            finally:
+                self.metrics.in_flight -= 1
+
+    def _open_reader(self) -> Connection:
+        connection = self._connect()
+        connection.execute("PRAGMA query_only=ON")
+        return connection
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[Connection]:
+        """
+        Dedicated read-only connection for a long-lived cursor, which shouldn't occupy a reader thread:
+        in WAL mode it reads a consistent snapshot and doesn't block the writer.
+        Up to `size` of them are open at once, they are counted in flight while open.
+        """
+        queued_at = perf_counter()
+        async with self._reader_slots:
+            with self._lock:
+                self.metrics.record_checkout(perf_counter() - queued_at, False)
+            self.metrics.in_flight += 1
+            try:
+                connection = await asyncio.to_thread(self._open_reader)
+                try:
+                    yield connection
+                finally:
+                    connection.close()
+            finally:
+                self.metrics.in_flight -= 1
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
@@ -0,0 +1,179 @@
+import re
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from sqlite3 import Connection
+from typing import Iterator, NamedTuple
+
+from controller.dependencies.filters import BaseFilter, FilterArgsMapEnum, filter_map_typing
+from controller.dependencies.pagination import Pagination
+from model.storage.raw_sql.utils import (
+    EPOCH_DECLTYPE,
+    encode_epoch,
+    make_count_statement,
+    make_select_joined_statement,
+)
+
+MIGRATIONS_PATH = Path(__file__).parent / "migrations"
+
+# substring search can't use a b-tree index, so such filters are not checked
+_unindexable_filter_types = {FilterArgsMapEnum.like_}
+# "SCAN TABLE" in SQLite before 3.36
+_full_scan_pattern = re.compile(r"^SCAN (TABLE )?\w+$")
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    sql: str
+
+
+class QueryPlanError(AssertionError):
+    ...
+
+
+def load_migrations(path: Path = MIGRATIONS_PATH) -> list[Migration]:
+    """Migrations are files named <version>_<name>.sql, the schema of init.sql is version 0"""
+    migrations = []
+    for file_path in path.glob("*.sql"):
+        version, name = file_path.stem.split("_", 1)
+        migrations.append(Migration(int(version), name, file_path.read_text(encoding="utf-8")))
+    return sorted(migrations)
+
+
+def migrate(connection: Connection, migrations: list[Migration] | None = None) -> list[int]:
+    """Applies migrations newer than PRAGMA user_version, each in its own transaction, returns applied versions"""
+    (current_version,) = connection.execute("PRAGMA user_version").fetchone()
+    applied = []
+    for migration in migrations if migrations is not None else load_migrations():
+        if migration.version <= current_version:
+            continue
+        try:
+            connection.executescript(f"BEGIN;\n{migration.sql}\nPRAGMA user_version = {migration.version};\nCOMMIT;")
+        except BaseException:
+            connection.rollback()
+            raise
+        applied.append(migration.version)
+    return applied
+
+
+_epoch_trips_table = f"""
+CREATE TABLE trips_epoch (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    company INTEGER NOT NULL,
+    plane VARCHAR(64) NOT NULL,
+    town_from VARCHAR(64) NOT NULL,
+    town_to VARCHAR(64) NOT NULL,
+    time_out {EPOCH_DECLTYPE} NOT NULL,
+    time_in {EPOCH_DECLTYPE} NOT NULL,
+    FOREIGN KEY (company)
+      REFERENCES companies (id)
+         ON DELETE CASCADE
+         ON UPDATE NO ACTION
+)
+"""
+
+
+def uses_epoch_timestamps(connection: Connection) -> bool:
+    return any(column[2] == EPOCH_DECLTYPE for column in connection.execute("PRAGMA table_info(trips)"))
+
+
+def _rebuild_trips_with_epoch(connection: Connection, indexes: list[tuple[str]], sequence: list[tuple[int]]):
+    connection.execute("BEGIN")
+    try:
+        connection.execute(_epoch_trips_table)
+        connection.executemany(
+            "INSERT INTO trips_epoch VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (*row[:5], encode_epoch(datetime.fromisoformat(row[5])), encode_epoch(datetime.fromisoformat(row[6])))
+                for row in connection.execute(
+                    "SELECT id, company, plane, town_from, town_to, time_out, time_in FROM trips"
+                )
+            ),
+        )
+        connection.execute("DROP TABLE trips")
+        connection.execute("ALTER TABLE trips_epoch RENAME TO trips")
+        for (sql_statement,) in indexes:
+            connection.execute(sql_statement)
+        if sequence:
+            connection.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'trips'", sequence[0])
+    except BaseException:
+        connection.rollback()
+        raise
+    connection.commit()
+
+
+def convert_timestamps_to_epoch(connection: Connection) -> bool:
+    """
+    One-shot rebuild of trips with time_out and time_in stored as epoch microseconds instead of ISO strings,
+    in one transaction, indexes of the table are created again. False if the table is converted already.
+    """
+    if uses_epoch_timestamps(connection):
+        return False
+    indexes = connection.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'trips' AND sql IS NOT NULL"
+    ).fetchall()
+    # ids of deleted trips must not be given again by AUTOINCREMENT
+    sequence = connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'trips'").fetchall()
+    # dropping the table must not delete tickets by cascade, the setting of the connection is restored after it
+    (foreign_keys,) = connection.execute("PRAGMA foreign_keys").fetchone()
+    connection.execute("PRAGMA foreign_keys = OFF")
+    try:
+        _rebuild_trips_with_epoch(connection, indexes, sequence)
+    finally:
+        connection.execute(f"PRAGMA foreign_keys = {foreign_keys}")
+    return True
+
+
+def _iter_declared_filters() -> Iterator[tuple[str, FilterArgsMapEnum, str]]:
+    """(table, filter type, field) of fields of BaseFilter dataclasses, which declare their model in Meta"""
+    for filter_class in BaseFilter.__subclasses__():
+        if (model := filter_class.Meta.model) is None:
+            continue
+        for dataclass_field in filter_class.__dataclass_fields__:
+            field, filter_type = dataclass_field.split("__")
+            yield model.Meta.table, FilterArgsMapEnum(filter_type + "_"), field
+
+
+def _make_sample_filter_map(filter_types: set[FilterArgsMapEnum], field: str) -> filter_map_typing:
+    return {
+        filter_type: [(field, [None, None] if filter_type == FilterArgsMapEnum.in_ else None)]
+        for filter_type in filter_types
+    }
+
+
+def make_hot_filter_maps(connection: Connection) -> list[tuple[str, filter_map_typing]]:
+    """
+    Filters of list endpoints and foreign keys, as (table, filter map) with placeholder values.
+    Range filters of a field are combined into one window: a page ordered by id with a one-sided range
+    is planned by SQLite as a walk in id order, which stops as soon as the page is filled.
+    """
+    range_filter_types: dict[tuple[str, str], set[FilterArgsMapEnum]] = defaultdict(set)
+    result = []
+    for table, filter_type, field in _iter_declared_filters():
+        match filter_type:
+            case FilterArgsMapEnum.eq_ | FilterArgsMapEnum.in_:
+                result.append((table, _make_sample_filter_map({filter_type}, field)))
+            case _ if filter_type not in _unindexable_filter_types:
+                range_filter_types[table, field].add(filter_type)
+    for (table, field), filter_types in range_filter_types.items():
+        result.append((table, _make_sample_filter_map(filter_types, field)))
+    for (table,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+        for foreign_key in connection.execute(f"PRAGMA foreign_key_list({table})").fetchall():
+            result.append((table, _make_sample_filter_map({FilterArgsMapEnum.eq_}, foreign_key[3])))
+    return result
+
+
+def verify_query_plans(connection: Connection):
+    """Checks with EXPLAIN QUERY PLAN, that pages and counts of hot filters don't scan the whole table"""
+    errors = []
+    for table, filter_map in make_hot_filter_maps(connection):
+        for sql_statement, parameters in (
+            make_select_joined_statement(table, (), filter_map, Pagination()),
+            make_count_statement(table, filter_map),
+        ):
+            plan = [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql_statement}", parameters)]
+            if any(_full_scan_pattern.match(step) for step in plan):
+                errors.append(f"{sql_statement}: {'; '.join(plan)}")
+    if errors:
+        raise QueryPlanError("Full table scans:\n" + "\n".join(errors))
@@ -1,41 +1,167 @@
 import asyncio
 import sqlite3
+from contextlib import closing
+from functools import partial
 from sqlite3 import Connection, Cursor
-from typing import Type
+from typing import AsyncIterator, Callable, Collection, Sequence, Type
 
 from config.settings import DatabaseSettings
 from controller.dependencies.filters import filter_map_typing
-from controller.dependencies.pagination import Pagination
-from model.storage.base import BaseDatabaseHandler, ModelVar
+from controller.dependencies.pagination import KeysetPagination, pagination_typing
+from model.db_entities.models import BaseDBModel
+from model.storage.base import BaseDatabaseHandler, ModelVar, Relation
 from model.storage.exceptions import EntityNotFoundError
-from model.storage.raw_sql.utils import make_sql_from_filter_map, make_pagination_sql, parse_db_record_into_model
+from model.storage.raw_sql.pool import ResultVar, SQLiteConnectionPool
+from model.storage.raw_sql.schema import (
+    convert_timestamps_to_epoch,
+    migrate,
+    uses_epoch_timestamps,
+    verify_query_plans,
+)
+from model.storage.raw_sql.utils import (
+    bind_epoch_timestamps,
+    check_joined_records,
+    compile_insert_statement,
+    compile_select_by_ids_statement,
+    compile_update_statement,
+    make_count_statement,
+    make_select_joined_statement,
+    make_select_statement,
+    parse_db_record_into_model,
+    parse_db_record_into_models,
+    skip_dangling_records,
+    statement_cache_info,
+)
 
 
-def make_insert_values_statement(table: str, data: dict) -> str:
-    insert_fields = ", ".join(data.keys())
-    insert_values = ", ".join(f'"{value}"' for value in data.values())
-    return f"INSERT INTO {table} ({insert_fields}) VALUES ({insert_values}) RETURNING *"
+def make_insert_values_statement(table: str, data: dict) -> tuple[str, tuple]:
+    return compile_insert_statement(table, tuple(data.keys())), tuple(data.values())
 
 
-def make_update_values_statement(table: str, data: dict, _id: int) -> str:
-    field_value_pairs = ",".join((f'{field} = "{value}"' for field, value in data.items()))
-    return f"UPDATE {table} SET {field_value_pairs} WHERE id = {_id} RETURNING *"
+def make_update_values_statement(table: str, data: dict, _id: int) -> tuple[str, tuple]:
+    return compile_update_statement(table, tuple(data.keys())), (*data.values(), _id)
+
+
+_bind_typing = Callable[[tuple], tuple]
+
+
+def _execute(sql_statement: str, parameters: tuple, commit: bool, connection: Connection) -> list[tuple]:
+    cursor: Cursor = connection.cursor()
+    cursor.execute(sql_statement, parameters)
+    result = cursor.fetchall()
+    if commit:
+        connection.commit()
+    return result
+
+
+def _execute_in_transaction(statements: Callable[[Cursor], ResultVar], connection: Connection) -> ResultVar:
+    """
+    Statements run in a savepoint, so a failure rolls back only them: the shared connection may have
+    an uncommitted write of another request pending, which a rollback of the whole transaction would discard
+    """
+    cursor: Cursor = connection.cursor()
+    cursor.execute("SAVEPOINT statements")
+    try:
+        result = statements(cursor)
+    except BaseException:
+        cursor.execute("ROLLBACK TO statements")
+        cursor.execute("RELEASE statements")
+        raise
+    cursor.execute("RELEASE statements")
+    connection.commit()
+    return result
+
+
+def _insert_many(table: str, values: Sequence[dict], bind: _bind_typing, cursor: Cursor) -> list[tuple]:
+    """
+    Each row is returned by its own INSERT ... RETURNING, which stays right whoever else writes to the table:
+    executemany can't return rows, and rows after the greatest id before insert may be not only the inserted ones
+    """
+    fields = tuple(values[0])
+    sql_statement = compile_insert_statement(table, fields)
+    return [cursor.execute(sql_statement, bind(tuple(map(value.get, fields)))).fetchone() for value in values]
+
+
+def _update_many(table: str, values: Sequence[tuple[int, dict]], bind: _bind_typing, cursor: Cursor) -> list[tuple]:
+    result = []
+    for _id, value in values:
+        sql_statement, parameters = make_update_values_statement(table, value, _id)
+        result.extend(cursor.execute(sql_statement, bind(parameters)).fetchall())
+    return result
+
+
+def _delete_many(table: str, ids: Collection[int], cursor: Cursor) -> list[int]:
+    sql_statement = f"DELETE FROM {table} WHERE id = ?"
+    return [_id for _id in dict.fromkeys(ids) if cursor.execute(sql_statement, (_id,)).rowcount]
 
 
 class SQLiteDBHandler(BaseDatabaseHandler):
     def __init__(self, connection: Connection | None = None):
+        super().__init__()
         self.connection = connection
+        self.pool: SQLiteConnectionPool | None = None
+        self.trusted_rows = False
+        self.epoch_timestamps = False
 
     async def connect(self, settings: DatabaseSettings):
-        if not self.connection:
-            self.connection = sqlite3.connect(settings.address)
+        """Connection given to the handler must be opened with detect_types=PARSE_DECLTYPES for epoch timestamps"""
+        self.trusted_rows = settings.trusted_rows
+        if self.connection is None and not settings.sqlite_pool:
+            self.connection = sqlite3.connect(
+                settings.address,
+                cached_statements=settings.sqlite_statement_cache_size,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+            )
+        if self.connection is not None:
+            self._prepare_schema(self.connection, settings)
+            return
+        # connections of the pool are opened lazily, so the schema is prepared before them
+        with closing(sqlite3.connect(settings.address)) as connection:
+            self._prepare_schema(connection, settings)
+        self.pool = SQLiteConnectionPool(
+            settings.address,
+            size=settings.sqlite_pool_size,
+            queue_size=settings.sqlite_pool_queue_size,
+            cached_statements=settings.sqlite_statement_cache_size,
+        )
+
+    def _prepare_schema(self, connection: Connection, settings: DatabaseSettings):
+        migrate(connection)
+        if settings.sqlite_epoch_timestamps:
+            convert_timestamps_to_epoch(connection)
+        # once converted, the database keeps epoch timestamps whatever the setting is
+        self.epoch_timestamps = uses_epoch_timestamps(connection)
+        if settings.sqlite_verify_query_plans:
+            verify_query_plans(connection)
+
+    def _to_model(self, record: tuple, model: Type[ModelVar]) -> ModelVar:
+        return parse_db_record_into_model(record, model, self.trusted_rows, self.epoch_timestamps)
+
+    def _to_models(self, record: tuple, models: Sequence[Type[BaseDBModel]]) -> tuple[BaseDBModel, ...]:
+        return parse_db_record_into_models(record, models, self.trusted_rows, self.epoch_timestamps)
 
     async def disconnect(self, _):
-        self.connection.close()
+        if self.pool:
+            await asyncio.to_thread(self.pool.close)
+        else:
+            self.connection.close()
+
+    def metrics(self) -> dict:
+        result = {"statements": statement_cache_info()}
+        if self.pool:
+            result["pool"] = self.pool.metrics.as_dict()
+        return result
+
+    def _bind(self, parameters: tuple) -> tuple:
+        """Datetime parameters in the format of this database"""
+        return bind_epoch_timestamps(parameters) if self.epoch_timestamps else parameters
 
-    async def _fetch(self, sql_statement: str, commit: bool = True) -> list[tuple]:
+    async def _fetch(self, sql_statement: str, parameters: tuple = (), commit: bool = True) -> list[tuple]:
+        parameters = self._bind(parameters)
+        if self.pool:
+            return await self.pool.run(partial(_execute, sql_statement, parameters, commit), write=commit)
         cursor: Cursor = self.connection.cursor()
-        cursor.execute(sql_statement)
+        cursor.execute(sql_statement, parameters)
         await asyncio.sleep(0)
         result = cursor.fetchall()
         if commit:
@@ -43,30 +169,117 @@ class SQLiteDBHandler(BaseDatabaseHandler):
             self.connection.commit()
         return result
 
+    async def _fetch_models(self, model: Type[ModelVar], sql_statement: str, parameters: tuple) -> list[ModelVar]:
+        rows = await self._fetch(sql_statement, parameters, commit=False)
+        return [self._to_model(row, model) for row in rows]
+
+    async def _run_in_transaction(self, statements: Callable[[Cursor], ResultVar]) -> ResultVar:
+        """Runs several statements with one commit"""
+        if self.pool:
+            return await self.pool.run(partial(_execute_in_transaction, statements), write=True)
+        return _execute_in_transaction(statements, self.connection)
+
     async def select(
-        self, model: Type[ModelVar], filter_map: filter_map_typing, pagination: Pagination
+        self, model: Type[ModelVar], filter_map: filter_map_typing, pagination: pagination_typing
     ) -> list[ModelVar]:
-        sql_statement = f"SELECT * FROM {model.Meta.table}"
-        if filter_sql_statement := make_sql_from_filter_map(filter_map):
-            sql_statement += filter_sql_statement
-        sql_statement += make_pagination_sql(pagination)
-        return [parse_db_record_into_model(row, model) for row in await self._fetch(sql_statement, commit=False)]
+        sql_statement, parameters = make_select_statement(model.Meta.table, filter_map, pagination)
+        return await self._fetch_models(model, sql_statement, parameters)
+
+    async def count(self, model: Type[BaseDBModel], filter_map: filter_map_typing) -> int:
+        sql_statement, parameters = make_count_statement(model.Meta.table, filter_map)
+        return (await self._fetch(sql_statement, parameters, commit=False))[0][0]
 
     async def select_by_id(self, model: Type[ModelVar], _id: int) -> ModelVar:
-        sql_statement = f"SELECT * FROM {(table := model.Meta.table)} WHERE id = {_id}"
-        if result := await self._fetch(sql_statement, commit=False):
-            return parse_db_record_into_model(result[0], model)
+        sql_statement = f"SELECT * FROM {(table := model.Meta.table)} WHERE id = ?"
+        if result := await self._fetch(sql_statement, (_id,), commit=False):
+            return self._to_model(result[0], model)
         raise EntityNotFoundError(table, _id)
 
+    async def select_by_ids(self, model: Type[ModelVar], ids: Collection[int]) -> list[ModelVar]:
+        if not ids:
+            return []
+        sql_statement = compile_select_by_ids_statement(model.Meta.table, len(ids))
+        return await self._fetch_models(model, sql_statement, tuple(ids))
+
+    async def select_joined(
+        self,
+        model: Type[BaseDBModel],
+        relations: Sequence[Relation],
+        filter_map: filter_map_typing,
+        pagination: pagination_typing,
+    ) -> list[tuple[BaseDBModel, ...]]:
+        sql_statement, parameters = make_select_joined_statement(model.Meta.table, relations, filter_map, pagination)
+        models = (model, *(relation.model for relation in relations))
+        rows = await self._fetch(sql_statement, parameters, commit=False)
+        check_joined_records(rows, models, relations)
+        return [self._to_models(row, models) for row in rows]
+
+    async def iter_select_joined(
+        self,
+        model: Type[BaseDBModel],
+        relations: Sequence[Relation],
+        filter_map: filter_map_typing,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[tuple[BaseDBModel, ...]]]:
+        """
+        With the pool, batches are fetched from one cursor over a dedicated read-only connection.
+        The shared connection selects keyset batches: its commits reset open cursors and, out of WAL mode,
+        a cursor left open between batches would lock the database for writes.
+        Rows referencing a missing entity are skipped, as by the generic implementation.
+        """
+        models = (model, *(relation.model for relation in relations))
+        if not self.pool:
+            pagination = KeysetPagination(limit=batch_size)
+            while records := await self._fetch(
+                *make_select_joined_statement(model.Meta.table, relations, filter_map, pagination), commit=False
+            ):
+                if records_to_yield := skip_dangling_records(records, models, relations):
+                    yield [self._to_models(record, models) for record in records_to_yield]
+                if len(records) < batch_size:
+                    return
+                # id is the first column of the row of `model`
+                pagination = pagination._replace(after=(records[-1][0],))
+            return
+        # negative limit means no limit in SQLite
+        pagination = KeysetPagination(limit=-1)
+        sql_statement, parameters = make_select_joined_statement(model.Meta.table, relations, filter_map, pagination)
+        async with self.pool.reader() as connection:
+            cursor = await asyncio.to_thread(connection.execute, sql_statement, self._bind(parameters))
+            while records := await asyncio.to_thread(cursor.fetchmany, batch_size):
+                if records_to_yield := skip_dangling_records(records, models, relations):
+                    yield [self._to_models(record, models) for record in records_to_yield]
+
     async def insert(self, model: Type[ModelVar], value: dict) -> ModelVar:
-        result = await self._fetch(make_insert_values_statement(model.Meta.table, value))
-        return parse_db_record_into_model(result[0], model)
+        result = await self._fetch(*make_insert_values_statement(table := model.Meta.table, value))
+        self.table_versions[table] += 1
+        return self._to_model(result[0], model)
 
     async def update_by_id(self, model: Type[ModelVar], _id: int, value: dict) -> ModelVar | None:
-        result = await self._fetch(make_update_values_statement(model.Meta.table, value, _id))
-        return parse_db_record_into_model(result[0], model)
+        if not (result := await self._fetch(*make_update_values_statement(table := model.Meta.table, value, _id))):
+            raise EntityNotFoundError(table, _id)
+        self.table_versions[table] += 1
+        return self._to_model(result[0], model)
 
     async def delete_by_id(self, model: Type[ModelVar], _id: int) -> bool:
-        sql_statement = f"DELETE FROM {model.Meta.table} WHERE id = {_id}"
-        await self._fetch(sql_statement)
+        sql_statement = f"DELETE FROM {(table := model.Meta.table)} WHERE id = ?"
+        await self._fetch(sql_statement, (_id,))
+        self.table_versions[table] += 1
         return True
+
+    async def insert_many(self, model: Type[ModelVar], values: Sequence[dict]) -> list[ModelVar]:
+        if not values:
+            return []
+        rows = await self._run_in_transaction(partial(_insert_many, table := model.Meta.table, values, self._bind))
+        self.table_versions[table] += 1
+        return [self._to_model(row, model) for row in rows]
+
+    async def update_many(self, model: Type[ModelVar], values: Sequence[tuple[int, dict]]) -> list[ModelVar]:
+        rows = await self._run_in_transaction(partial(_update_many, table := model.Meta.table, values, self._bind))
+        if rows:
+            self.table_versions[table] += 1
+        return [self._to_model(row, model) for row in rows]
+
+    async def delete_many(self, model: Type[ModelVar], ids: Collection[int]) -> list[int]:
+        if result := await self._run_in_transaction(partial(_delete_many, table := model.Meta.table, ids)):
+            self.table_versions[table] += 1
+        return result
@@ -1,8 +1,17 @@
-from typing import Type, Any
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import accumulate
+from typing import Type, Any, Sequence
 
 from controller.dependencies.filters import filter_map_typing, FilterArgsMapEnum
-from controller.dependencies.pagination import Pagination
-from model.storage.base import ModelVar
+from controller.dependencies.pagination import KeysetPagination, pagination_typing
+from model.db_entities.models import BaseDBModel
+from model.db_entities.utils import make_row_factory, row_factory_typing
+from model.storage.base import ModelVar, Relation, log_skipped_rows
+from model.storage.exceptions import EntityNotFoundError
+
+STATEMENT_CACHE_SIZE = 256
 
 _sql_statement_map: dict[FilterArgsMapEnum, str] = {
     "eq_": "=",
@@ -14,35 +23,263 @@ _sql_statement_map: dict[FilterArgsMapEnum, str] = {
     "like_": "LIKE",
 }
 
+EPOCH = datetime(1970, 1, 1)
+# declared type of timestamp columns stored as integer microseconds since EPOCH, "INT" in it gives integer affinity
+EPOCH_DECLTYPE = "EPOCH_INTEGER"
+
+
+def encode_epoch(value: datetime) -> int:
+    """Naive datetimes are taken as UTC, aware ones are converted to it"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def decode_epoch(value: bytes) -> datetime:
+    # positional arguments make timedelta a bit cheaper, it's called for every value read
+    return EPOCH + timedelta(0, 0, int(value))
+
+
+def bind_epoch_timestamps(parameters: tuple) -> tuple:
+    """
+    Datetime parameters as epoch microseconds for a database with epoch timestamps. Adapters of sqlite3 are global,
+    so the registered one keeps the ISO format of rows created by init.sql for every other database of the process.
+    """
+    return tuple(encode_epoch(value) if isinstance(value, datetime) else value for value in parameters)
 
-def _adapt_value(filter_type: FilterArgsMapEnum, value: Any) -> str:
+
+sqlite3.register_adapter(datetime, datetime.isoformat)
+# converters apply only to connections with PARSE_DECLTYPES and columns declared with the type
+sqlite3.register_converter(EPOCH_DECLTYPE, decode_epoch)
+
+filter_shape_typing = tuple[tuple[FilterArgsMapEnum, str, int], ...]
+# (keyset key, has cursor) for KeysetPagination, ((), has offset) for Pagination
+pagination_shape_typing = tuple[tuple[str, ...], bool]
+
+
+def make_filter_shape(filter_map: filter_map_typing) -> filter_shape_typing:
+    """Describes filter map without values: (filter type, field, number of placeholders)"""
+    return tuple(
+        (filter_type, field, len(value) if filter_type == FilterArgsMapEnum.in_ else 1)
+        for filter_type, field_value_list in filter_map.items()
+        for field, value in field_value_list
+    )
+
+
+def _adapt_value(filter_type: FilterArgsMapEnum, value: Any) -> tuple:
     match filter_type:
         case FilterArgsMapEnum.in_:
-            list_value = ", ".join(tuple(f"\"{element}\"" for element in value))
-            return f"({list_value})"
+            return tuple(value)
         case FilterArgsMapEnum.like_:
-            return f"\"%{value}%\""
+            return (f"%{value}%",)
         case _:
-            return f"\"{value}\""
+            return (value,)
+
 
+def make_filter_parameters(filter_map: filter_map_typing) -> tuple:
+    return tuple(
+        parameter
+        for filter_type, field_value_list in filter_map.items()
+        for field, value in field_value_list
+        for parameter in _adapt_value(filter_type, value)
+    )
 
-def make_sql_from_filter_map(filter_map: filter_map_typing) -> str:
-    if not filter_map:
-        return ""
+
+def _make_filter_expressions(filter_shape: filter_shape_typing, alias: str | None = None) -> list[str]:
     _expressions = []
-    for filter_type, field_value_list in filter_map.items():
+    for filter_type, field, placeholders_count in filter_shape:
         _operator = _sql_statement_map[filter_type]
-        for field, value in field_value_list:
-            _expressions.append(f"{field} {_operator} {_adapt_value(filter_type, value)}")
-    return " WHERE " + "AND ".join(_expressions)
+        if alias:
+            field = f"{alias}.{field}"
+        if filter_type == FilterArgsMapEnum.in_:
+            _expressions.append(f"{field} {_operator} ({', '.join('?' * placeholders_count)})")
+        else:
+            _expressions.append(f"{field} {_operator} ?")
+    return _expressions
+
+
+def make_sql_from_filter_shape(filter_shape: filter_shape_typing, alias: str | None = None) -> str:
+    if _expressions := _make_filter_expressions(filter_shape, alias):
+        return " WHERE " + " AND ".join(_expressions)
+    return ""
+
+
+def make_pagination_shape(pagination: pagination_typing) -> pagination_shape_typing:
+    if isinstance(pagination, KeysetPagination):
+        return pagination.key, pagination.after is not None
+    return (), bool(pagination.offset)
+
+
+def make_sql_from_shapes(
+    filter_shape: filter_shape_typing, pagination_shape: pagination_shape_typing, alias: str | None = None
+) -> str:
+    """WHERE, ORDER BY and LIMIT clauses, keyset pages are ordered by key and start after the cursor"""
+    key, with_cursor_or_offset = pagination_shape
+    _expressions = _make_filter_expressions(filter_shape, alias)
+    prefix = f"{alias}." if alias else ""
+    key_columns = ", ".join(prefix + field for field in key)
+    if key and with_cursor_or_offset:
+        _expressions.append(f"({key_columns}) > ({', '.join('?' * len(key))})")
+    sql_statement = " WHERE " + " AND ".join(_expressions) if _expressions else ""
+    if key:
+        return sql_statement + f" ORDER BY {key_columns} LIMIT ?"
+    if alias:
+        sql_statement += f" ORDER BY {alias}.id"
+    return sql_statement + (" LIMIT ? OFFSET ?" if with_cursor_or_offset else " LIMIT ?")
 
 
-def make_pagination_sql(pagination: Pagination) -> str:
-    _expression = f" LIMIT {pagination.limit}"
+def make_pagination_parameters(pagination: pagination_typing) -> tuple:
+    if isinstance(pagination, KeysetPagination):
+        return *(pagination.after or ()), pagination.limit
     if pagination.offset:
-        _expression += f" OFFSET {pagination.offset}"
-    return _expression
+        return pagination.limit, pagination.offset
+    return (pagination.limit,)
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def compile_select_statement(
+    table: str, filter_shape: filter_shape_typing, pagination_shape: pagination_shape_typing
+) -> str:
+    return f"SELECT * FROM {table}" + make_sql_from_shapes(filter_shape, pagination_shape)
+
+
+def make_select_statement(
+    table: str, filter_map: filter_map_typing, pagination: pagination_typing
+) -> tuple[str, tuple]:
+    sql_statement = compile_select_statement(table, make_filter_shape(filter_map), make_pagination_shape(pagination))
+    return sql_statement, make_filter_parameters(filter_map) + make_pagination_parameters(pagination)
+
+
+joins_typing = tuple[tuple[str, str, int], ...]
 
 
-def parse_db_record_into_model(record: tuple, model: Type[ModelVar]) -> ModelVar:
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def compile_select_joined_statement(
+    table: str, joins: joins_typing, filter_shape: filter_shape_typing, pagination_shape: pagination_shape_typing
+) -> str:
+    """
+    Joins (table, foreign key field, index of source table) to `table`, tables are aliased as t0, t1, ...
+    Joins are outer, so a row with a dangling foreign key is selected with NULL columns of the missing row
+    instead of vanishing from the result, see check_joined_records.
+    """
+    columns = ", ".join(f"t{index}.*" for index in range(len(joins) + 1))
+    sql_statement = f"SELECT {columns} FROM {table} AS t0"
+    for index, (related_table, field, source) in enumerate(joins, start=1):
+        sql_statement += f" LEFT JOIN {related_table} AS t{index} ON t{index}.id = t{source}.{field}"
+    return sql_statement + make_sql_from_shapes(filter_shape, pagination_shape, alias="t0")
+
+
+def make_select_joined_statement(
+    table: str, relations: Sequence[Relation], filter_map: filter_map_typing, pagination: pagination_typing
+) -> tuple[str, tuple]:
+    joins = tuple((relation.model.Meta.table, relation.field, relation.source) for relation in relations)
+    sql_statement = compile_select_joined_statement(
+        table, joins, make_filter_shape(filter_map), make_pagination_shape(pagination)
+    )
+    return sql_statement, make_filter_parameters(filter_map) + make_pagination_parameters(pagination)
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def compile_count_statement(table: str, filter_shape: filter_shape_typing) -> str:
+    return f"SELECT COUNT(*) FROM {table}" + make_sql_from_filter_shape(filter_shape)
+
+
+def make_count_statement(table: str, filter_map: filter_map_typing) -> tuple[str, tuple]:
+    return compile_count_statement(table, make_filter_shape(filter_map)), make_filter_parameters(filter_map)
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def compile_select_by_ids_statement(table: str, ids_count: int) -> str:
+    return f"SELECT * FROM {table} WHERE id IN ({', '.join('?' * ids_count)})"
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def compile_insert_statement(table: str, fields: tuple[str, ...]) -> str:
+    return f"INSERT INTO {table} ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))}) RETURNING *"
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def compile_update_statement(table: str, fields: tuple[str, ...]) -> str:
+    field_value_pairs = ", ".join(f"{field} = ?" for field in fields)
+    return f"UPDATE {table} SET {field_value_pairs} WHERE id = ? RETURNING *"
+
+
+def statement_cache_info() -> dict[str, dict]:
+    result = {}
+    for compile_func in (
+        compile_select_statement,
+        compile_select_joined_statement,
+        compile_count_statement,
+        compile_select_by_ids_statement,
+        compile_insert_statement,
+        compile_update_statement,
+    ):
+        hits, misses, maxsize, currsize = compile_func.cache_info()
+        result[compile_func.__name__] = {"hits": hits, "misses": misses, "maxsize": maxsize, "size": currsize}
+    return result
+
+
+@lru_cache(maxsize=None)
+def get_row_factory(model: Type[BaseDBModel], epoch_timestamps: bool = False) -> row_factory_typing:
+    """
+    Row factory for records of `SELECT *`, columns of tables are declared in order of model fields.
+    Epoch timestamps are converted into datetimes by the registered converter already.
+    """
+    return make_row_factory(model, tuple(model.__fields__), (datetime,) if epoch_timestamps else ())
+
+
+def parse_db_record_into_model(
+    record: tuple, model: Type[ModelVar], trusted: bool = False, epoch_timestamps: bool = False
+) -> ModelVar:
+    """Trusted records are typed by the database already, so they are mapped without validation"""
+    if trusted:
+        return get_row_factory(model, epoch_timestamps)(record)
     return model.parse_obj(zip(model.__fields__, record))
+
+
+def parse_db_record_into_models(
+    record: tuple, models: Sequence[Type[BaseDBModel]], trusted: bool = False, epoch_timestamps: bool = False
+) -> tuple[BaseDBModel, ...]:
+    """Splits a joined record into models by the number of their fields"""
+    result, start = [], 0
+    for model in models:
+        end = start + len(model.__fields__)
+        result.append(parse_db_record_into_model(record[start:end], model, trusted, epoch_timestamps))
+        start = end
+    return tuple(result)
+
+
+def _joined_record_offsets(
+    models: Sequence[Type[BaseDBModel]], relations: Sequence[Relation]
+) -> list[tuple[Relation, int, int]]:
+    """(relation, offset of id of the related row, offset of the foreign key) in a joined record"""
+    offsets = list(accumulate((len(model.__fields__) for model in models), initial=0))
+    result = []
+    for index, relation in enumerate(relations, start=1):
+        field_offset = offsets[relation.source] + list(models[relation.source].__fields__).index(relation.field)
+        result.append((relation, offsets[index], field_offset))
+    return result
+
+
+def check_joined_records(
+    records: Sequence[tuple], models: Sequence[Type[BaseDBModel]], relations: Sequence[Relation]
+):
+    """
+    Raises EntityNotFoundError for the smallest dangling foreign key of the first relation having one,
+    as the generic select_joined does: id of a missing related row is NULL in a LEFT JOIN record
+    """
+    for relation, id_offset, field_offset in _joined_record_offsets(models, relations):
+        if missing_ids := {record[field_offset] for record in records if record[id_offset] is None}:
+            raise EntityNotFoundError(relation.model.Meta.table, min(missing_ids))
+
+
+def skip_dangling_records(
+    records: Sequence[tuple], models: Sequence[Type[BaseDBModel]], relations: Sequence[Relation]
+) -> Sequence[tuple]:
+    """Records without missing related rows, the others are logged as the generic iter_select_joined does"""
+    for relation, id_offset, field_offset in _joined_record_offsets(models, relations):
+        if missing_ids := {record[field_offset] for record in records if record[id_offset] is None}:
+            kept_records = [record for record in records if record[id_offset] is not None]
+            log_skipped_rows(len(records) - len(kept_records), relation.model.Meta.table, missing_ids)
+            records = kept_records
+    return records
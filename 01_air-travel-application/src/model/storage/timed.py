@@ -0,0 +1,97 @@
+from typing import AsyncIterator, Collection, Sequence, Type
+
+from controller.dependencies.filters import filter_map_typing
+from controller.dependencies.pagination import pagination_typing
+from model.db_entities.models import BaseDBModel
+from model.services.timing import timed
+from model.storage.base import BaseDatabaseHandler, ModelVar, Relation
+
+
+class TimedDatabaseHandler(BaseDatabaseHandler):
+    """
+    Adds time and count of calls of any handler to the "db" phase of the current request.
+    The wrapper is installed only when server timing is enabled, so other setups don't pay for it.
+    """
+
+    def __init__(self, handler: BaseDatabaseHandler):
+        super().__init__()
+        self.handler = handler
+        self.table_versions = handler.table_versions
+
+    async def connect(self, settings):
+        await self.handler.connect(settings)
+
+    async def disconnect(self, settings):
+        await self.handler.disconnect(settings)
+
+    def metrics(self) -> dict:
+        return self.handler.metrics()
+
+    async def select(
+        self, model: Type[ModelVar], filter_map: filter_map_typing, pagination: pagination_typing
+    ) -> list[ModelVar]:
+        with timed("db"):
+            return await self.handler.select(model, filter_map, pagination)
+
+    async def count(self, model: Type[BaseDBModel], filter_map: filter_map_typing) -> int:
+        with timed("db"):
+            return await self.handler.count(model, filter_map)
+
+    async def select_by_id(self, model: Type[ModelVar], _id: int) -> ModelVar:
+        with timed("db"):
+            return await self.handler.select_by_id(model, _id)
+
+    async def select_by_ids(self, model: Type[ModelVar], ids: Collection[int]) -> list[ModelVar]:
+        with timed("db"):
+            return await self.handler.select_by_ids(model, ids)
+
+    async def select_joined(
+        self,
+        model: Type[BaseDBModel],
+        relations: Sequence[Relation],
+        filter_map: filter_map_typing,
+        pagination: pagination_typing,
+    ) -> list[tuple[BaseDBModel, ...]]:
+        with timed("db"):
+            return await self.handler.select_joined(model, relations, filter_map, pagination)
+
+    async def iter_select_joined(
+        self,
+        model: Type[BaseDBModel],
+        relations: Sequence[Relation],
+        filter_map: filter_map_typing,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[tuple[BaseDBModel, ...]]]:
+        """Each batch is timed as a call, time of the consumer between batches is not"""
+        batches = aiter(self.handler.iter_select_joined(model, relations, filter_map, batch_size))
+        while True:
+            with timed("db"):
+                try:
+                    rows = await anext(batches)
+                except StopAsyncIteration:
+                    return
+            yield rows
+
+    async def insert(self, model: Type[ModelVar], value: dict) -> ModelVar:
+        with timed("db"):
+            return await self.handler.insert(model, value)
+
+    async def update_by_id(self, model: Type[ModelVar], _id: int, value: dict) -> ModelVar | None:
+        with timed("db"):
+            return await self.handler.update_by_id(model, _id, value)
+
+    async def delete_by_id(self, model: Type[ModelVar], _id: int) -> bool:
+        with timed("db"):
+            return await self.handler.delete_by_id(model, _id)
+
+    async def insert_many(self, model: Type[ModelVar], values: Sequence[dict]) -> list[ModelVar]:
+        with timed("db"):
+            return await self.handler.insert_many(model, values)
+
+    async def update_many(self, model: Type[ModelVar], values: Sequence[tuple[int, dict]]) -> list[ModelVar]:
+        with timed("db"):
+            return await self.handler.update_many(model, values)
+
+    async def delete_many(self, model: Type[ModelVar], ids: Collection[int]) -> list[int]:
+        with timed("db"):
+            return await self.handler.delete_many(model, ids)